@@ -5,6 +5,7 @@ from __future__ import annotations
 import asyncio
 import json
 import os
+import sys
 
 # Load .env if present
 try:
@@ -63,16 +64,23 @@ async def example_extract_and_annotate() -> None:
         print(f"Extractor unavailable: {exc}")
         return
 
-    entities = await extractor.extract(text)
-    print(f"Extracted {len(entities)} entities:\n")
-
-    if not entities:
-        print("  (none)")
-        return
-
+    # Annotation of each entity starts as soon as the model has emitted it,
+    # overlapping ontology lookups with the rest of the LLM response.
     async with OntologyAnnotator(settings) as annotator:
-        for entity in entities:
-            result = await annotator.annotate(entity["text"], domain=entity["domain"])
+        pending = []
+        async for entity in extractor.extract_stream(text):
+            task = asyncio.create_task(
+                annotator.annotate(entity["text"], domain=entity["domain"])
+            )
+            pending.append((entity, task))
+
+        print(f"Extracted {len(pending)} entities:\n")
+        if not pending:
+            print("  (none)")
+            return
+
+        for entity, task in pending:
+            result = await task
             print(f"  [{entity['domain']}] {entity['text']!r}  (conf={entity['extraction_confidence']:.2f})")
             for m in result["matches"][:2]:
                 print(f"    -> {m['term_id']} ({m['ontology']}) [{m['match_type']}]")
@@ -84,4 +92,17 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Use uvloop's faster event loop when installed (not available on Windows)
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+
+    if uvloop is None:
+        asyncio.run(main())
+    elif sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            runner.run(main())
+    else:
+        uvloop.install()
+        asyncio.run(main())
@@ -3,65 +3,74 @@
 from __future__ import annotations
 
 import asyncio
+import copy
 import logging
+import re
+from collections import OrderedDict
 from typing import Any
 
+import msgspec
+
+try:
+    from rapidfuzz import fuzz, process
+    from rapidfuzz import utils as rf_utils
+except ImportError:  # optional; matches keep their stage confidence
+    process = None
+
 from .bioportal_client import BioPortalClient
 from .config import VALID_DOMAINS, Settings, get_settings
+from .local_index import LocalExactIndex
 from .ols_client import OLSClient
 
 logger = logging.getLogger(__name__)
 
 # Confidence scores for each match stage
+CONFIDENCE_EXACT_ID = 0.99
 CONFIDENCE_EXACT_LABEL = 0.98
 CONFIDENCE_SYNONYM = 0.85
 CONFIDENCE_OLS_SEARCH = 0.75
 CONFIDENCE_BIOPORTAL = 0.70
 
+# Blend of stage confidence and label similarity used to order matches (RapidFuzz)
+RERANK_STAGE_WEIGHT = 0.7
+RERANK_SIMILARITY_WEIGHT = 0.3
 
-class OntologyMatch:
-    __slots__ = (
-        "term_id",
-        "label",
-        "ontology",
-        "match_type",
-        "confidence",
-        "definition",
-        "synonyms",
-        "cross_references",
-    )
+# Inputs that can never name an ontology term; answered without any lookup
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or that the this to was with".split()
+)
 
-    def __init__(
-        self,
-        term_id: str,
-        label: str,
-        ontology: str,
-        match_type: str,
-        confidence: float,
-        definition: str | None = None,
-        synonyms: list[str] | None = None,
-        cross_references: dict[str, str] | None = None,
-    ) -> None:
-        self.term_id = term_id
-        self.label = label
-        self.ontology = ontology
-        self.match_type = match_type
-        self.confidence = confidence
-        self.definition = definition
-        self.synonyms = synonyms or []
-        self.cross_references = cross_references or {}
+# Prefixed IDs such as MONDO:0005015 or HP:0001250, tried as a direct ID lookup
+_CURIE_RE = re.compile(r"^[A-Za-z][A-Za-z0-9_.]*:[A-Za-z0-9_]+$")
+
+# Characters marking an input as a likely Stage 1 miss (see _likely_miss)
+_SPECULATE_CHARS = frozenset(",;()[]/")
+
+# Tie-break between matches of equal confidence in _deduplicate
+_MATCH_TYPE_PRIORITY = {
+    "exact_id": 5,
+    "exact_label": 4,
+    "synonym": 3,
+    "ols_search": 2,
+    "bioportal": 1,
+}
+
+# (text, domain, preferred_ontologies, use_bioportal_fallback, min_confidence)
+CacheKey = tuple[str, str | None, tuple[str, ...], bool, float]
+
+
+class OntologyMatch(msgspec.Struct):
+    term_id: str
+    label: str
+    ontology: str
+    match_type: str
+    confidence: float
+    definition: str | None = None
+    synonyms: list[str] = []
+    cross_references: dict[str, str] = {}
 
     def to_dict(self) -> dict[str, Any]:
-        return {
-            "term_id": self.term_id,
-            "label": self.label,
-            "ontology": self.ontology,
-            "match_type": self.match_type,
-            "confidence": self.confidence,
-            "definition": self.definition,
-            "synonyms": self.synonyms,
-            "cross_references": self.cross_references,
-        }
+        return msgspec.structs.asdict(self)
 
 
 def _raw_to_match(raw: dict[str, Any], match_type: str, confidence: float) -> OntologyMatch:
@@ -77,16 +86,74 @@ def _raw_to_match(raw: dict[str, Any], match_type: str, confidence: float) -> On
     )
 
 
+def _match_rank(m: OntologyMatch) -> tuple[float, int]:
+    return m.confidence, _MATCH_TYPE_PRIORITY.get(m.match_type, 0)
+
+
 def _deduplicate(matches: list[OntologyMatch]) -> list[OntologyMatch]:
-    """Remove duplicates by term_id, keeping the first (highest confidence) occurrence."""
-    seen: set[str] = set()
-    unique: list[OntologyMatch] = []
+    """Remove duplicates by term_id, keeping the most confident match for each term.
+
+    Ties go to the stronger match type (e.g. exact_label over synonym).
+    """
+    best: dict[tuple[str, str], OntologyMatch] = {}
     for m in matches:
-        key = f"{m.ontology}:{m.term_id}" if m.term_id else f"{m.ontology}:{m.label}"
-        if key not in seen:
-            seen.add(key)
-            unique.append(m)
-    return unique
+        key = (m.ontology, m.term_id or m.label)
+        prev = best.get(key)
+        if prev is None or _match_rank(m) > _match_rank(prev):
+            best[key] = m
+    return list(best.values())
+
+
+def _rerank(text: str, matches: list[OntologyMatch]) -> list[OntologyMatch]:
+    """Order matches by stage confidence blended with similarity to `text`.
+
+    Similarity is the best WRatio over each match's label and synonyms, so
+    synonym hits are not penalised for a label that differs from the query. The
+    reported confidences are left untouched; the blend only decides the order.
+    """
+    def blended(m: OntologyMatch) -> float:
+        best = process.extractOne(
+            text, [m.label, *m.synonyms], scorer=fuzz.WRatio, processor=rf_utils.default_process
+        )
+        similarity = best[1] / 100.0 if best else 0.0
+        return RERANK_STAGE_WEIGHT * m.confidence + RERANK_SIMILARITY_WEIGHT * similarity
+
+    return sorted(matches, key=blended, reverse=True)
+
+
+def _cache_key(
+    text: str,
+    domain: str | None,
+    preferred_ontologies: list[str] | None,
+    use_bioportal_fallback: bool,
+    min_confidence: float,
+) -> CacheKey:
+    return (
+        text.lower(),
+        domain,
+        tuple(o.lower() for o in preferred_ontologies or ()),
+        use_bioportal_fallback,
+        min_confidence,
+    )
+
+
+def _is_trivial(text: str) -> bool:
+    stripped = text.strip()
+    # Stopwords only match as typed in lower case, so abbreviations such as "AS"
+    # (ankylosing spondylitis) still reach OLS
+    return len(stripped) < 2 or stripped.isdigit() or stripped in _STOPWORDS
+
+
+def _likely_miss(text: str) -> bool:
+    """Heuristic for inputs that rarely match an ontology label exactly."""
+    return len(text) > 25 or any(c in _SPECULATE_CHARS for c in text)
+
+
+def _copy_result(result: dict[str, Any], text: str) -> dict[str, Any]:
+    """Return a private copy of a cached result, echoing the caller's input text."""
+    copied = copy.deepcopy(result)
+    copied["input_text"] = text
+    return copied
 
 
 class OntologyAnnotator:
@@ -96,6 +163,17 @@ class OntologyAnnotator:
         self._bioportal: BioPortalClient | None = (
             BioPortalClient(self._settings) if self._settings.bioportal_enabled else None
         )
+        # LRU of resolved results, plus in-flight lookups so concurrent duplicate
+        # queries share a single pipeline run.
+        self._cache: OrderedDict[CacheKey, dict[str, Any]] = OrderedDict()
+        self._cache_size = self._settings.annotation_cache_size
+        self._inflight: dict[CacheKey, asyncio.Task[dict[str, Any]]] = {}
+        # Callers currently awaiting each in-flight lookup; when the last one is
+        # cancelled the lookup itself is cancelled too
+        self._waiters: dict[asyncio.Task[dict[str, Any]], int] = {}
+        # Local exact-match index, built on first use if OBO files are configured
+        self._local_index: LocalExactIndex | None = None
+        self._local_index_lock = asyncio.Lock()
 
     async def close(self) -> None:
         await self._ols.close()
@@ -110,13 +188,51 @@ class OntologyAnnotator:
 
     def _resolve_ontologies(
         self, domain: str | None, preferred: list[str] | None
-    ) -> list[str] | None:
+    ) -> tuple[str, ...] | None:
         if preferred:
-            return [o.lower() for o in preferred]
+            return tuple(o.lower() for o in preferred)
         if domain and domain in VALID_DOMAINS:
             return self._settings.ontologies_for_domain(domain)
         return None
 
+    async def _get_local_index(self) -> LocalExactIndex | None:
+        paths = self._settings.local_obo_paths
+        if not paths:
+            return None
+        if self._local_index is None:
+            async with self._local_index_lock:
+                if self._local_index is None:
+                    self._local_index = await asyncio.to_thread(
+                        LocalExactIndex.from_obo_files, paths
+                    )
+        return self._local_index
+
+    def _remember(self, key: CacheKey, result: dict[str, Any]) -> None:
+        if self._cache_size <= 0:
+            return
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _failed_searches(self) -> int:
+        bioportal = self._bioportal.failed_searches if self._bioportal else 0
+        return self._ols.failed_searches + bioportal
+
+    def _forget_inflight(self, key: CacheKey, task: asyncio.Task[dict[str, Any]]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _resolve(self, key: CacheKey, *args: Any) -> dict[str, Any]:
+        failed = self._failed_searches()
+        result = await self._annotate_uncached(*args)
+        # A failed search reads as "no match", so don't cache what an outage
+        # produced. The counters are shared by concurrent lookups, which may make
+        # an outage skip caching a good result too; retrying that is harmless.
+        if self._failed_searches() == failed:
+            self._remember(key, result)
+        return result
+
     async def annotate(
         self,
         text: str,
@@ -127,52 +243,181 @@ class OntologyAnnotator:
     ) -> dict[str, Any]:
         """Annotate a single text term through the multi-stage pipeline.
 
-        Pipeline:
+        Pipeline (CURIE-shaped inputs are first looked up by ID; trivial inputs
+        such as stopwords or bare numbers return no matches without a lookup):
+          0. Exact label/synonym match in the local OBO index (if configured)
           1. Exact label match via OLS
           2. Synonym match via OLS
           3. Fuzzy/search via OLS
           4. BioPortal fallback (if enabled and configured)
+
+        Results are cached per (case-insensitive text, options); concurrent
+        identical queries are collapsed into one pipeline run.
         """
+        # Rounded once so the cache key and the confidence filter agree
+        min_confidence = round(min_confidence, 3)
+        key = _cache_key(
+            text, domain, preferred_ontologies, use_bioportal_fallback, min_confidence
+        )
+        return await self._lookup(
+            key, text, domain, preferred_ontologies, use_bioportal_fallback, min_confidence
+        )
+
+    async def _lookup(
+        self,
+        key: CacheKey,
+        text: str,
+        domain: str | None,
+        preferred_ontologies: list[str] | None,
+        use_bioportal_fallback: bool,
+        min_confidence: float,
+        exact: list[dict[str, Any]] | None = None,
+    ) -> dict[str, Any]:
+        if _is_trivial(text):
+            return {"input_text": text, "matches": []}
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return _copy_result(cached, text)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._resolve(
+                    key,
+                    text,
+                    domain,
+                    preferred_ontologies,
+                    use_bioportal_fallback,
+                    min_confidence,
+                    exact,
+                )
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget_inflight(key, t))
+        # Shield so one cancelled caller doesn't abort the lookup for the others
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            remaining = self._waiters[task] - 1
+            if remaining:
+                self._waiters[task] = remaining
+            else:
+                del self._waiters[task]
+                if not task.done():
+                    # Unregister first so a new caller starts afresh rather than
+                    # joining a lookup that is being cancelled
+                    self._forget_inflight(key, task)
+                    task.cancel()
+        return _copy_result(result, text)
+
+    async def _annotate_uncached(
+        self,
+        text: str,
+        domain: str | None,
+        preferred_ontologies: list[str] | None,
+        use_bioportal_fallback: bool,
+        min_confidence: float,
+        exact: list[dict[str, Any]] | None = None,
+    ) -> dict[str, Any]:
+        """Run the pipeline; `exact` holds Stage 1 results already fetched in bulk."""
         ontologies = self._resolve_ontologies(domain, preferred_ontologies)
         matches: list[OntologyMatch] = []
 
-        # Stage 1: exact label
-        exact = await self._ols.find_exact(text, ontologies)
-        for raw in exact:
-            matches.append(_raw_to_match(raw, "exact_label", CONFIDENCE_EXACT_LABEL))
+        # Direct ID lookup for CURIE-shaped input
+        curie = _CURIE_RE.match(text.strip())
+        if curie and (not ontologies or curie.group().split(":", 1)[0].lower() in ontologies):
+            for raw in await self._ols.find_by_id(curie.group()):
+                matches.append(_raw_to_match(raw, "exact_id", CONFIDENCE_EXACT_ID))
 
-        # Stage 2: synonym match (only if no exact label found)
-        if not matches:
-            synonyms = await self._ols.find_by_synonym(text, ontologies)
-            for raw in synonyms:
-                matches.append(_raw_to_match(raw, "synonym", CONFIDENCE_SYNONYM))
+        # Stage 0: local exact index (skips OLS entirely on a hit)
+        local_index = await self._get_local_index()
+        if local_index is not None and not matches:
+            for raw in local_index.find_exact(text, ontologies):
+                matches.append(_raw_to_match(raw, "exact_label", CONFIDENCE_EXACT_LABEL))
+            if not matches:
+                for raw in local_index.find_by_synonym(text, ontologies):
+                    matches.append(_raw_to_match(raw, "synonym", CONFIDENCE_SYNONYM))
 
-        # Stage 3: OLS fuzzy search (only if still no matches)
+        # Stages 1-3: OLS exact label, synonym, fuzzy search
         if not matches:
-            fuzzy = await self._ols.fuzzy_search(text, ontologies)
-            for raw in fuzzy:
-                matches.append(_raw_to_match(raw, "ols_search", CONFIDENCE_OLS_SEARCH))
+            matches = await self._ols_stages(text, ontologies, exact)
 
         # Stage 4: BioPortal fallback
         if not matches and use_bioportal_fallback and self._bioportal:
-            bp_results = await self._bioportal.find_exact(text, ontologies)
+            # Domain defaults have their acronyms precomputed at Settings load
+            acronyms = (
+                self._settings.bioportal_acronyms_for_domain(domain)
+                if not preferred_ontologies and domain in VALID_DOMAINS
+                else None
+            )
+            bp_results = await self._bioportal.find_exact(text, ontologies, acronyms)
             if not bp_results:
-                bp_results = await self._bioportal.fuzzy_search(text, ontologies)
+                bp_results = await self._bioportal.fuzzy_search(text, ontologies, acronyms)
             for raw in bp_results:
                 matches.append(_raw_to_match(raw, "bioportal", CONFIDENCE_BIOPORTAL))
 
-        # Deduplicate and filter by confidence
-        matches = _deduplicate(matches)
-        matches = [m for m in matches if m.confidence >= min_confidence]
-
-        # Sort: highest confidence first
-        matches.sort(key=lambda m: m.confidence, reverse=True)
+        # Deduplicate and filter on stage confidence, then order the survivors:
+        # by label/synonym similarity when re-ranking, else highest confidence first
+        matches = [m for m in _deduplicate(matches) if m.confidence >= min_confidence]
+        if len(matches) > 1 and process is not None and self._settings.rerank_matches:
+            matches = _rerank(text, matches)
+        else:
+            matches.sort(key=lambda m: m.confidence, reverse=True)
 
         return {
             "input_text": text,
-            "matches": [m.to_dict() for m in matches],
+            "matches": msgspec.to_builtins(matches),
         }
 
+    async def _ols_stages(
+        self,
+        text: str,
+        ontologies: tuple[str, ...] | None,
+        exact: list[dict[str, Any]] | None,
+    ) -> list[OntologyMatch]:
+        """Run OLS Stages 1-3, returning the first stage that yields matches.
+
+        Stages normally run one after another. For inputs unlikely to have an
+        exact label, all three requests are issued at once; results are still
+        taken in stage order and the rest are cancelled.
+        """
+        speculative: dict[str, asyncio.Future[list[dict[str, Any]]]] = {}
+        # `exact` is only passed for bulk hits, which end the pipeline at Stage 1
+        if exact is None and _likely_miss(text):
+            speculative["exact"] = asyncio.ensure_future(self._ols.find_exact(text, ontologies))
+            speculative["synonym"] = asyncio.ensure_future(
+                self._ols.find_by_synonym(text, ontologies)
+            )
+            speculative["fuzzy"] = asyncio.ensure_future(self._ols.fuzzy_search(text, ontologies))
+
+        try:
+            # Stage 1: exact label
+            if exact is None:
+                exact = await (
+                    speculative.get("exact") or self._ols.find_exact(text, ontologies)
+                )
+            if exact:
+                return [_raw_to_match(r, "exact_label", CONFIDENCE_EXACT_LABEL) for r in exact]
+
+            # Stage 2: synonym match (only if no exact label found)
+            synonyms = await (
+                speculative.get("synonym") or self._ols.find_by_synonym(text, ontologies)
+            )
+            if synonyms:
+                return [_raw_to_match(r, "synonym", CONFIDENCE_SYNONYM) for r in synonyms]
+
+            # Stage 3: OLS fuzzy search (only if still no matches)
+            fuzzy = await (speculative.get("fuzzy") or self._ols.fuzzy_search(text, ontologies))
+            return [_raw_to_match(r, "ols_search", CONFIDENCE_OLS_SEARCH) for r in fuzzy]
+        finally:
+            for fut in speculative.values():
+                if not fut.done():
+                    fut.cancel()
+                elif not fut.cancelled():
+                    fut.exception()  # mark retrieved; only the awaited stages matter
+
     async def annotate_batch(
         self,
         texts: list[str],
@@ -181,15 +426,85 @@ class OntologyAnnotator:
         use_bioportal_fallback: bool = True,
         min_confidence: float = 0.7,
     ) -> list[dict[str, Any]]:
-        """Annotate multiple texts concurrently."""
+        """Annotate multiple texts concurrently.
+
+        Identical texts (case-insensitive) are looked up once and fanned back out.
+        """
+        if not texts:
+            return []
+        min_confidence = round(min_confidence, 3)
+        keys = [
+            _cache_key(t, domain, preferred_ontologies, use_bioportal_fallback, min_confidence)
+            for t in texts
+        ]
+        # Trivial texts are answered directly rather than deduplicated: a stopword
+        # such as "as" shares its key with case variants ("AS") that need a lookup
+        trivial = [_is_trivial(t) for t in texts]
+        unique: dict[CacheKey, str] = {}
+        for key, text, skip in zip(keys, texts, trivial):
+            if not skip:
+                unique.setdefault(key, text)
+
+        resolved: dict[CacheKey, dict[str, Any]] = {}
+        # A single distinct text needs no bulk lookup or task fan-out
+        if len(unique) == 1:
+            ((key, text),) = unique.items()
+            resolved[key] = await self._lookup(
+                key, text, domain, preferred_ontologies, use_bioportal_fallback, min_confidence
+            )
+        elif unique:
+            resolved = await self._lookup_many(
+                unique, domain, preferred_ontologies, use_bioportal_fallback, min_confidence
+            )
+        return [
+            {"input_text": text, "matches": []} if skip else _copy_result(resolved[key], text)
+            for key, text, skip in zip(keys, texts, trivial)
+        ]
+
+    async def _lookup_many(
+        self,
+        unique: dict[CacheKey, str],
+        domain: str | None,
+        preferred_ontologies: list[str] | None,
+        use_bioportal_fallback: bool,
+        min_confidence: float,
+    ) -> dict[CacheKey, dict[str, Any]]:
+        """Look up several distinct texts, fetching their Stage 1 results in bulk."""
+        # Resolve Stage 1 for all uncached texts with one OLS request
+        ontologies = self._resolve_ontologies(domain, preferred_ontologies)
+        pending = [
+            text
+            for key, text in unique.items()
+            if key not in self._cache
+            and key not in self._inflight
+            and not _CURIE_RE.match(text.strip())
+        ]
+        local_index = await self._get_local_index()
+        if local_index is not None:
+            pending = [
+                t
+                for t in pending
+                if not (
+                    local_index.find_exact(t, ontologies)
+                    or local_index.find_by_synonym(t, ontologies)
+                )
+            ]
+        # Only hits are trusted: the shared row limit can crowd a term out of the
+        # bulk response, so absent terms still run their own Stage 1 lookup
+        bulk_exact = (
+            await self._ols.find_exact_bulk(pending, ontologies) if len(pending) > 1 else None
+        ) or {}
+
         tasks = [
-            self.annotate(
+            self._lookup(
+                key,
                 text,
-                domain=domain,
-                preferred_ontologies=preferred_ontologies,
-                use_bioportal_fallback=use_bioportal_fallback,
-                min_confidence=min_confidence,
+                domain,
+                preferred_ontologies,
+                use_bioportal_fallback,
+                min_confidence,
+                exact=bulk_exact.get(text.lower()),
             )
-            for text in texts
+            for key, text in unique.items()
         ]
-        return list(await asyncio.gather(*tasks))
+        return dict(zip(unique, await asyncio.gather(*tasks)))
@@ -3,12 +3,16 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Sequence
+from functools import lru_cache
 from typing import Any
 
 import httpx
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
-from .config import Settings, get_settings
+from .config import BIOPORTAL_ACRONYM_MAP, Settings, get_settings
+from .http_pool import acquire_client, release_client
+from .response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -17,37 +21,40 @@ class BioPortalError(Exception):
     """Raised when a BioPortal API call fails."""
 
 
-# Map our generic ontology names to BioPortal acronyms
-BIOPORTAL_ACRONYM_MAP: dict[str, str] = {
-    "mondo": "MONDO",
-    "doid": "DOID",
-    "hp": "HP",
-    "chebi": "CHEBI",
-    "drugbank": "DRUGBANK",
-    "hgnc": "HGNC",
-    "ncbigene": "NCBIGENE",
-    "mp": "MP",
-    "uberon": "UBERON",
-    "fma": "FMA",
-    "ncbitaxon": "NCBITAXON",
-}
+@lru_cache(maxsize=256)
+def _acronyms_for(ontologies: tuple[str, ...]) -> tuple[str, ...]:
+    return tuple(BIOPORTAL_ACRONYM_MAP.get(o.lower(), o.upper()) for o in ontologies)
 
 
 class BioPortalClient:
     def __init__(self, settings: Settings | None = None) -> None:
         self._settings = settings or get_settings()
-        self._base_url = self._settings.bioportal_api_url.rstrip("/")
+        self._base_url = self._settings.bioportal_base_url
         self._api_key = self._settings.bioportal_api_key
-        self._client = httpx.AsyncClient(
+        self._client = acquire_client(
+            self._settings,
+            self._base_url,
             timeout=self._settings.bioportal_timeout,
             headers={
                 "Accept": "application/json",
                 "Authorization": f"apikey token={self._api_key}",
             },
         )
+        self._cache: ResponseCache | None = (
+            ResponseCache(
+                self._settings.response_cache_path, self._settings.response_cache_ttl_days
+            )
+            if self._settings.response_cache_path
+            else None
+        )
+        # Searches answered with no results because the request failed, so callers
+        # can tell an outage from a genuine miss
+        self.failed_searches = 0
 
     async def close(self) -> None:
-        await self._client.aclose()
+        await release_client(self._client)
+        if self._cache is not None:
+            self._cache.close()
 
     async def __aenter__(self) -> BioPortalClient:
         return self
@@ -55,13 +62,25 @@ class BioPortalClient:
     async def __aexit__(self, *args: Any) -> None:
         await self.close()
 
+    async def _get(self, path: str, params: dict[str, Any] | None = None) -> Any:
+        """GET `path`, served from the persistent response cache when enabled."""
+        if self._cache is None:
+            return await self._fetch(path, params)
+        key = ResponseCache.make_key(f"{self._base_url}{path}", params)
+        cached = await self._cache.get(key)
+        if cached is not None:
+            return cached
+        data = await self._fetch(path, params)
+        await self._cache.set(key, data)
+        return data
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=10),
         retry=retry_if_exception_type((httpx.TimeoutException, httpx.ConnectError)),
         reraise=True,
     )
-    async def _get(self, path: str, params: dict[str, Any] | None = None) -> Any:
+    async def _fetch(self, path: str, params: dict[str, Any] | None = None) -> Any:
         if not self._api_key:
             raise BioPortalError("BIOPORTAL_API_KEY is not configured")
         url = f"{self._base_url}{path}"
@@ -78,10 +97,10 @@ class BioPortalClient:
         except Exception as exc:
             raise BioPortalError(f"BioPortal request failed: {exc}") from exc
 
-    def _ontology_acronyms(self, ontologies: list[str] | None) -> list[str]:
+    def _ontology_acronyms(self, ontologies: Sequence[str] | None) -> tuple[str, ...]:
         if not ontologies:
-            return []
-        return [BIOPORTAL_ACRONYM_MAP.get(o.lower(), o.upper()) for o in ontologies]
+            return ()
+        return _acronyms_for(tuple(ontologies))
 
     def _parse_result(self, item: dict[str, Any]) -> dict[str, Any]:
         prefLabel: str = item.get("prefLabel") or ""
@@ -126,18 +145,24 @@ class BioPortalClient:
     async def search(
         self,
         query: str,
-        ontologies: list[str] | None = None,
+        ontologies: Sequence[str] | None = None,
         exact: bool = False,
         rows: int | None = None,
+        acronyms: Sequence[str] | None = None,
     ) -> list[dict[str, Any]]:
-        """Search BioPortal for terms matching `query`."""
+        """Search BioPortal for terms matching `query`.
+
+        `acronyms` (e.g. from Settings.bioportal_acronyms_for_domain) are used
+        as-is in place of mapping `ontologies`.
+        """
         params: dict[str, Any] = {
             "q": query,
             "pagesize": rows or self._settings.bioportal_max_results,
             "display_links": "false",
             "display_context": "false",
         }
-        acronyms = self._ontology_acronyms(ontologies)
+        if acronyms is None:
+            acronyms = self._ontology_acronyms(ontologies)
         if acronyms:
             params["ontologies"] = ",".join(acronyms)
         if exact:
@@ -147,6 +172,7 @@ class BioPortalClient:
             data = await self._get("/search", params)
         except BioPortalError:
             logger.warning("BioPortal search failed for query=%r", query)
+            self.failed_searches += 1
             return []
 
         if not isinstance(data, dict):
@@ -156,13 +182,19 @@ class BioPortalClient:
         return [self._parse_result(item) for item in items]
 
     async def find_exact(
-        self, query: str, ontologies: list[str] | None = None
+        self,
+        query: str,
+        ontologies: Sequence[str] | None = None,
+        acronyms: Sequence[str] | None = None,
     ) -> list[dict[str, Any]]:
-        results = await self.search(query, ontologies=ontologies, exact=True)
+        results = await self.search(query, ontologies=ontologies, exact=True, acronyms=acronyms)
         query_lower = query.lower()
         return [r for r in results if (r.get("label") or "").lower() == query_lower]
 
     async def fuzzy_search(
-        self, query: str, ontologies: list[str] | None = None
+        self,
+        query: str,
+        ontologies: Sequence[str] | None = None,
+        acronyms: Sequence[str] | None = None,
     ) -> list[dict[str, Any]]:
-        return await self.search(query, ontologies=ontologies, exact=False)
+        return await self.search(query, ontologies=ontologies, exact=False, acronyms=acronyms)
@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 from functools import lru_cache
+from typing import Any
 
+from pydantic import PrivateAttr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 DOMAIN_ONTOLOGY_DEFAULTS: dict[str, list[str]] = {
@@ -17,6 +19,21 @@ DOMAIN_ONTOLOGY_DEFAULTS: dict[str, list[str]] = {
 
 VALID_DOMAINS = frozenset(DOMAIN_ONTOLOGY_DEFAULTS.keys())
 
+# Map our generic ontology names to BioPortal acronyms
+BIOPORTAL_ACRONYM_MAP: dict[str, str] = {
+    "mondo": "MONDO",
+    "doid": "DOID",
+    "hp": "HP",
+    "chebi": "CHEBI",
+    "drugbank": "DRUGBANK",
+    "hgnc": "HGNC",
+    "ncbigene": "NCBIGENE",
+    "mp": "MP",
+    "uberon": "UBERON",
+    "fma": "FMA",
+    "ncbitaxon": "NCBITAXON",
+}
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -24,6 +41,7 @@ class Settings(BaseSettings):
         env_file_encoding="utf-8",
         case_sensitive=False,
         extra="ignore",
+        frozen=True,
     )
 
     # Anthropic
@@ -48,23 +66,93 @@ class Settings(BaseSettings):
     default_anatomy_ontologies: str = "uberon,fma"
     default_organism_ontologies: str = "ncbitaxon"
 
+    # HTTP connection pool (shared per API base URL)
+    http2: bool = True
+    http_max_connections: int = 64
+    http_max_keepalive_connections: int = 64
+    http_keepalive_expiry: float = 30.0
+
     # Retry settings
     max_retries: int = 3
     retry_min_wait: float = 1.0
     retry_max_wait: float = 10.0
 
-    def ontologies_for_domain(self, domain: str) -> list[str]:
-        """Return the configured ontology list for a domain."""
+    # Re-rank multiple candidates by label similarity (requires rapidfuzz)
+    rerank_matches: bool = True
+
+    # Pretty-print tool responses (compact JSON by default)
+    pretty_json: bool = False
+
+    # Upper bound on concurrent annotate() calls per extract_and_annotate request
+    max_concurrent_annotations: int = 8
+
+    # In-process cache of annotate() results (0 disables)
+    annotation_cache_size: int = 4096
+
+    # Persistent SQLite cache of OLS/BioPortal responses (empty path disables)
+    response_cache_path: str = ""
+    response_cache_ttl_days: float = 30.0
+
+    # Local OBO files (comma-separated paths) used for exact label/synonym
+    # lookups before querying OLS
+    local_obo_files: str = ""
+
+    # Derived values, computed once in model_post_init (settings are frozen, so
+    # they can never go stale)
+    _domain_ontologies: dict[str, tuple[str, ...]] = PrivateAttr(default_factory=dict)
+    _bioportal_acronyms: dict[str, tuple[str, ...]] = PrivateAttr(default_factory=dict)
+    _ols_base_url: str = PrivateAttr(default="")
+    _bioportal_base_url: str = PrivateAttr(default="")
+    _local_obo_paths: tuple[str, ...] = PrivateAttr(default=())
+
+    def model_post_init(self, __context: Any) -> None:
+        self._ols_base_url = self.ols_api_url.rstrip("/")
+        self._bioportal_base_url = self.bioportal_api_url.rstrip("/")
+        self._local_obo_paths = tuple(
+            p.strip() for p in self.local_obo_files.split(",") if p.strip()
+        )
+        self._domain_ontologies = {
+            d: self._parse_domain_ontologies(d) for d in DOMAIN_ONTOLOGY_DEFAULTS
+        }
+        self._bioportal_acronyms = {
+            d: tuple(BIOPORTAL_ACRONYM_MAP.get(o, o.upper()) for o in onts)
+            for d, onts in self._domain_ontologies.items()
+        }
+
+    def _parse_domain_ontologies(self, domain: str) -> tuple[str, ...]:
         attr = f"default_{domain}_ontologies"
         raw = getattr(self, attr, None)
         if raw:
-            return [o.strip().lower() for o in raw.split(",") if o.strip()]
-        return DOMAIN_ONTOLOGY_DEFAULTS.get(domain, [])
+            return tuple(o.strip().lower() for o in raw.split(",") if o.strip())
+        return tuple(DOMAIN_ONTOLOGY_DEFAULTS.get(domain, []))
+
+    def ontologies_for_domain(self, domain: str) -> tuple[str, ...]:
+        """Return the configured ontology list for a domain."""
+        cached = self._domain_ontologies.get(domain)
+        if cached is not None:
+            return cached
+        return self._parse_domain_ontologies(domain)
+
+    def bioportal_acronyms_for_domain(self, domain: str) -> tuple[str, ...]:
+        """Return the BioPortal acronyms for a domain's configured ontologies."""
+        return self._bioportal_acronyms.get(domain, ())
 
     @property
     def bioportal_enabled(self) -> bool:
         return bool(self.bioportal_api_key)
 
+    @property
+    def local_obo_paths(self) -> tuple[str, ...]:
+        return self._local_obo_paths
+
+    @property
+    def ols_base_url(self) -> str:
+        return self._ols_base_url
+
+    @property
+    def bioportal_base_url(self) -> str:
+        return self._bioportal_base_url
+
 
 @lru_cache(maxsize=1)
 def get_settings() -> Settings:
@@ -5,14 +5,23 @@ from __future__ import annotations
 import json
 import logging
 import re
+from collections.abc import AsyncIterator
 from typing import Any
 
 import anthropic
 
+from . import serialization
 from .config import VALID_DOMAINS, Settings, get_settings
 
 logger = logging.getLogger(__name__)
 
+# Body of the first markdown code fence, wherever it starts (the model sometimes
+# writes prose first); a missing closing fence, as in truncated output, is tolerated
+_FENCE_RE = re.compile(r"```[A-Za-z]*\s*(.*?)\s*(?:```|\Z)", re.DOTALL)
+
+EXTRACTION_MODEL = "claude-haiku-4-5-20251001"
+EXTRACTION_MAX_TOKENS = 2048
+
 EXTRACTION_PROMPT = """\
 Extract biomedical entities from the following text.
 
@@ -35,6 +44,56 @@ class ExtractionError(Exception):
     """Raised when entity extraction fails."""
 
 
+def _locate(haystack: str, needle: str, hint: int) -> int:
+    """Offset of `needle` at or after `hint`, else its first offset (-1 if absent)."""
+    idx = haystack.find(needle, hint)
+    return haystack.find(needle) if idx == -1 and hint else idx
+
+
+def _first_offsets(haystack: str, needles: set[str]) -> dict[str, int]:
+    """Map each needle to its first offset in `haystack` (absent if not found)."""
+    return {n: idx for n in needles if (idx := haystack.find(n)) != -1}
+
+
+class _StreamedArrayParser:
+    """Pull complete top-level objects out of a JSON array as it streams in."""
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pos = 0
+        self._decoder = json.JSONDecoder()
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._buffer
+
+    def _incomplete(self, exc: json.JSONDecodeError) -> bool:
+        # A chunk can end mid-string, mid-number or mid-literal (e.g. `0.` or `tr`),
+        # so only treat the object as malformed once later text proves it cannot
+        # complete: another object starting or the array closing after the error
+        if exc.msg.startswith("Unterminated string"):
+            return True
+        tail = self._buffer[exc.pos :]
+        return "{" not in tail and "]" not in tail
+
+    def feed(self, chunk: str) -> list[Any]:
+        self._buffer += chunk
+        objects: list[Any] = []
+        while (start := self._buffer.find("{", self._pos)) != -1:
+            try:
+                obj, end = self._decoder.raw_decode(self._buffer, start)
+            except json.JSONDecodeError as exc:
+                if self._incomplete(exc):
+                    break  # wait for more text
+                # A brace in prose (e.g. "{see below}"): skip past it
+                self._pos = start + 1
+                continue
+            objects.append(obj)
+            self._pos = end
+        return objects
+
+
 class EntityExtractor:
     def __init__(self, settings: Settings | None = None) -> None:
         self._settings = settings or get_settings()
@@ -44,6 +103,9 @@ class EntityExtractor:
             )
         self._client = anthropic.AsyncAnthropic(api_key=self._settings.anthropic_api_key)
 
+    async def close(self) -> None:
+        await self._client.close()
+
     async def extract(
         self,
         text: str,
@@ -54,21 +116,11 @@ class EntityExtractor:
         Returns a list of entity dicts with keys:
             text, start_pos, end_pos, domain, extraction_confidence
         """
-        effective_domains = domains or list(VALID_DOMAINS)
-        # Validate
-        invalid = [d for d in effective_domains if d not in VALID_DOMAINS]
-        if invalid:
-            raise ExtractionError(f"Invalid domains: {invalid}")
-
-        prompt = EXTRACTION_PROMPT.format(
-            text=text,
-            domains=", ".join(effective_domains),
-        )
-
+        prompt = self._build_prompt(text, domains)
         try:
             message = await self._client.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=2048,
+                model=EXTRACTION_MODEL,
+                max_tokens=EXTRACTION_MAX_TOKENS,
                 messages=[{"role": "user", "content": prompt}],
             )
         except anthropic.APIError as exc:
@@ -77,17 +129,60 @@ class EntityExtractor:
         content = message.content[0].text if message.content else ""
         return self._parse_response(content, text)
 
+    async def extract_stream(
+        self,
+        text: str,
+        domains: list[str] | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Like `extract`, but yield each entity as soon as the model has emitted it.
+
+        Lets callers start annotating early entities while the rest of the
+        response is still being generated.
+        """
+        prompt = self._build_prompt(text, domains)
+        parser = _StreamedArrayParser()
+        text_lower = text.lower()
+        yielded = False
+        try:
+            async with self._client.messages.stream(
+                model=EXTRACTION_MODEL,
+                max_tokens=EXTRACTION_MAX_TOKENS,
+                messages=[{"role": "user", "content": prompt}],
+            ) as stream:
+                async for chunk in stream.text_stream:
+                    for ent in parser.feed(chunk):
+                        for entity in self._validate_entities([ent], text, text_lower):
+                            yielded = True
+                            yield entity
+            # Nothing usable streamed: parse the full response the way `extract`
+            # does, which also logs why it could not be parsed
+            if not yielded:
+                for entity in self._parse_response(parser.text, text):
+                    yield entity
+        except anthropic.APIError as exc:
+            raise ExtractionError(f"Anthropic API error: {exc}") from exc
+
+    def _build_prompt(self, text: str, domains: list[str] | None) -> str:
+        effective_domains = domains or list(VALID_DOMAINS)
+        # Validate
+        invalid = [d for d in effective_domains if d not in VALID_DOMAINS]
+        if invalid:
+            raise ExtractionError(f"Invalid domains: {invalid}")
+
+        return EXTRACTION_PROMPT.format(
+            text=text,
+            domains=", ".join(effective_domains),
+        )
+
     def _parse_response(self, content: str, original_text: str) -> list[dict[str, Any]]:
         """Parse the LLM JSON response and validate/fix position offsets."""
         # Strip markdown code fences if present
-        content = content.strip()
-        content = re.sub(r"^```(?:json)?\s*", "", content)
-        content = re.sub(r"\s*```$", "", content)
-        content = content.strip()
+        m = _FENCE_RE.search(content)
+        content = m.group(1) if m else content.strip()
 
         try:
-            entities: list[dict[str, Any]] = json.loads(content)
-        except json.JSONDecodeError as exc:
+            entities: list[dict[str, Any]] = serialization.loads(content)
+        except serialization.JSONDecodeError as exc:
             logger.warning("Failed to parse LLM entity extraction response: %s", exc)
             return []
 
@@ -95,7 +190,20 @@ class EntityExtractor:
             logger.warning("LLM returned non-list entity response")
             return []
 
-        validated: list[dict[str, Any]] = []
+        return self._validate_entities(entities, original_text)
+
+    def _validate_entities(
+        self,
+        entities: list[Any],
+        original_text: str,
+        original_lower: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Drop malformed entities and fix position offsets against the original text."""
+        # (text, domain, confidence, start_pos, end_pos, hint); positions are None
+        # when they must be re-derived from the original text, searching from the
+        # model's start_pos hint when it gave one
+        candidates: list[tuple[str, str, float, int | None, int | None, int]] = []
+        to_locate: set[str] = set()
         for ent in entities:
             if not isinstance(ent, dict):
                 continue
@@ -111,6 +219,7 @@ class EntityExtractor:
             end_pos: int | None = ent.get("end_pos")
 
             # Re-derive positions if model's are wrong or missing
+            hint = 0
             if (
                 start_pos is None
                 or end_pos is None
@@ -118,8 +227,27 @@ class EntityExtractor:
                 or not isinstance(end_pos, int)
                 or original_text[start_pos:end_pos] != entity_text
             ):
-                idx = original_text.lower().find(entity_text.lower())
-                if idx == -1:
+                if isinstance(start_pos, int) and 0 < start_pos < len(original_text):
+                    hint = start_pos
+                else:
+                    to_locate.add(entity_text.lower())
+                start_pos = end_pos = None
+
+            candidates.append((entity_text, domain, confidence, start_pos, end_pos, hint))
+
+        if original_lower is None:
+            original_lower = original_text.lower()
+        offsets = _first_offsets(original_lower, to_locate) if to_locate else {}
+
+        validated: list[dict[str, Any]] = []
+        for entity_text, domain, confidence, start_pos, end_pos, hint in candidates:
+            if start_pos is None:
+                if hint:
+                    found = _locate(original_lower, entity_text.lower(), hint)
+                    idx = found if found != -1 else None
+                else:
+                    idx = offsets.get(entity_text.lower())
+                if idx is None:
                     logger.debug(
                         "Discarding extracted entity (not found in text): %r [%s]",
                         entity_text,
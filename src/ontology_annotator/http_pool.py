@@ -0,0 +1,51 @@
+"""Shared, connection-pooled httpx clients for the ontology API clients."""
+
+from __future__ import annotations
+
+import httpx
+
+from .config import Settings
+
+PoolKey = tuple[str, float, tuple[tuple[str, str], ...]]
+
+# One client per (base URL, timeout, headers), shared by every API client instance
+# and closed when the last user releases it.
+_clients: dict[PoolKey, httpx.AsyncClient] = {}
+_refcounts: dict[PoolKey, int] = {}
+_keys_by_client: dict[int, PoolKey] = {}
+
+
+def acquire_client(
+    settings: Settings, base_url: str, timeout: float, headers: dict[str, str]
+) -> httpx.AsyncClient:
+    """Return the shared client for `base_url`, creating it on first use."""
+    key: PoolKey = (base_url, timeout, tuple(sorted(headers.items())))
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        if client is not None:
+            _keys_by_client.pop(id(client), None)
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        # Retries are handled by tenacity in the API clients, not the transport
+        transport = httpx.AsyncHTTPTransport(http2=settings.http2, limits=limits, retries=0)
+        client = httpx.AsyncClient(timeout=timeout, headers=headers, transport=transport)
+        _clients[key] = client
+        _refcounts[key] = 0
+        _keys_by_client[id(client)] = key
+    _refcounts[key] += 1
+    return client
+
+
+async def release_client(client: httpx.AsyncClient) -> None:
+    """Drop one reference to a shared client, closing it when unused."""
+    key = _keys_by_client.get(id(client))
+    if key is None or _clients.get(key) is not client:
+        await client.aclose()
+        return
+    _refcounts[key] -= 1
+    if _refcounts[key] <= 0:
+        del _clients[key], _refcounts[key], _keys_by_client[id(client)]
+        await client.aclose()
@@ -0,0 +1,175 @@
+"""Optional in-memory label/synonym index built from local OBO files."""
+
+from __future__ import annotations
+
+import logging
+import pickle
+import re
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Bump when the pickled layout changes so stale caches are rebuilt
+_PICKLE_VERSION = 1
+
+_QUOTED_RE = re.compile(r'^"((?:[^"\\]|\\.)*)"\s*(.*)$')
+
+TermIndex = dict[str, list[dict[str, Any]]]
+
+
+def _unquote(value: str) -> tuple[str, str]:
+    """Split an OBO quoted value into (text, remainder)."""
+    m = _QUOTED_RE.match(value)
+    if not m:
+        return value, ""
+    return m.group(1).replace('\\"', '"'), m.group(2)
+
+
+def _finish_term(
+    stanza: dict[str, Any], default_ontology: str, labels: TermIndex, synonyms: TermIndex
+) -> None:
+    term_id: str = stanza.get("id") or ""
+    label: str = stanza.get("name") or ""
+    if not term_id or not label or stanza.get("obsolete"):
+        return
+
+    prefix, _, local = term_id.partition(":")
+    ontology = default_ontology or prefix.lower()
+    term = {
+        "term_id": term_id,
+        "label": label,
+        "ontology": ontology,
+        "definition": stanza.get("def"),
+        "synonyms": stanza["synonyms"],
+        "iri": f"http://purl.obolibrary.org/obo/{prefix}_{local}" if local else "",
+        "cross_references": stanza["xrefs"],
+    }
+    labels.setdefault(label.lower(), []).append(term)
+    for syn in stanza["synonyms"]:
+        synonyms.setdefault(syn.lower(), []).append(term)
+
+
+def parse_obo(path: Path) -> tuple[TermIndex, TermIndex]:
+    """Parse an OBO file into (label index, exact-synonym index)."""
+    labels: TermIndex = {}
+    synonyms: TermIndex = {}
+    default_ontology = ""
+    stanza: dict[str, Any] | None = None
+
+    with path.open(encoding="utf-8") as fh:
+        for raw_line in fh:
+            line = raw_line.strip()
+            if not line or line.startswith("!"):
+                continue
+            if line.startswith("["):
+                if stanza is not None:
+                    _finish_term(stanza, default_ontology, labels, synonyms)
+                stanza = {"synonyms": [], "xrefs": {}} if line == "[Term]" else None
+                continue
+
+            tag, _, value = line.partition(":")
+            value = value.strip()
+            if stanza is None:
+                if tag == "ontology" and not default_ontology:
+                    default_ontology = value.lower()
+                continue
+
+            if tag == "id":
+                stanza["id"] = value
+            elif tag == "name":
+                stanza["name"] = value
+            elif tag == "def":
+                stanza["def"] = _unquote(value)[0]
+            elif tag == "synonym":
+                text, rest = _unquote(value)
+                if rest.startswith("EXACT"):
+                    stanza["synonyms"].append(text)
+            elif tag == "xref":
+                db, _, acc = value.split(" ", 1)[0].partition(":")
+                if db and acc:
+                    stanza["xrefs"][db.lower()] = f"{db.upper()}:{acc}"
+            elif tag == "is_obsolete" and value == "true":
+                stanza["obsolete"] = True
+
+    if stanza is not None:
+        _finish_term(stanza, default_ontology, labels, synonyms)
+    return labels, synonyms
+
+
+def _load_file(path: Path) -> tuple[TermIndex, TermIndex]:
+    """Load a parsed OBO file, reusing a pickle beside it when still fresh."""
+    cache_path = path.with_name(path.name + ".index.pkl")
+    try:
+        if cache_path.stat().st_mtime >= path.stat().st_mtime:
+            with cache_path.open("rb") as fh:
+                version, labels, synonyms = pickle.load(fh)
+            if version == _PICKLE_VERSION:
+                return labels, synonyms
+    except (OSError, pickle.UnpicklingError, ValueError, EOFError):
+        pass
+
+    labels, synonyms = parse_obo(path)
+    try:
+        with cache_path.open("wb") as fh:
+            pickle.dump((_PICKLE_VERSION, labels, synonyms), fh, pickle.HIGHEST_PROTOCOL)
+    except OSError as exc:
+        logger.debug("Could not write local index cache %s: %s", cache_path, exc)
+    return labels, synonyms
+
+
+class LocalExactIndex:
+    """Case-insensitive exact label/synonym lookups without a network round-trip."""
+
+    def __init__(
+        self, labels: TermIndex | None = None, synonyms: TermIndex | None = None
+    ) -> None:
+        self._labels: TermIndex = labels or {}
+        self._synonyms: TermIndex = synonyms or {}
+
+    @classmethod
+    def from_obo_files(cls, paths: Iterable[str | Path]) -> LocalExactIndex:
+        index = cls()
+        for p in paths:
+            path = Path(p).expanduser()
+            try:
+                labels, synonyms = _load_file(path)
+            except (OSError, ValueError) as exc:  # ValueError covers UnicodeDecodeError
+                logger.warning("Skipping local ontology file %s: %s", path, exc)
+                continue
+            for key, terms in labels.items():
+                index._labels.setdefault(key, []).extend(terms)
+            for key, terms in synonyms.items():
+                index._synonyms.setdefault(key, []).extend(terms)
+            logger.info("Loaded %d labels from %s", len(labels), path)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    @staticmethod
+    def _filter(
+        terms: Iterable[dict[str, Any]], ontologies: Iterable[str] | None
+    ) -> list[dict[str, Any]]:
+        if not ontologies:
+            return list(terms)
+        wanted = set(ontologies)
+        return [t for t in terms if t["ontology"] in wanted]
+
+    def find_exact(
+        self, query: str, ontologies: Iterable[str] | None = None
+    ) -> list[dict[str, Any]]:
+        """Return terms whose label exactly matches `query` (case-insensitive)."""
+        return self._filter(self._labels.get(query.lower(), ()), ontologies)
+
+    def find_by_synonym(
+        self, query: str, ontologies: Iterable[str] | None = None
+    ) -> list[dict[str, Any]]:
+        """Return terms with an exact synonym matching `query` (case-insensitive)."""
+        query_lower = query.lower()
+        return [
+            t
+            for t in self._filter(self._synonyms.get(query_lower, ()), ontologies)
+            if t["label"].lower() != query_lower
+        ]
@@ -2,16 +2,23 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections.abc import Sequence
 from typing import Any
 
 import httpx
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 from .config import Settings, get_settings
+from .http_pool import acquire_client, release_client
+from .response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
+# Phrases OR-ed into one find_exact_bulk request
+BULK_EXACT_BATCH_SIZE = 20
+
 
 class OLSError(Exception):
     """Raised when an OLS API call fails."""
@@ -20,14 +27,28 @@ class OLSError(Exception):
 class OLSClient:
     def __init__(self, settings: Settings | None = None) -> None:
         self._settings = settings or get_settings()
-        self._base_url = self._settings.ols_api_url.rstrip("/")
-        self._client = httpx.AsyncClient(
+        self._base_url = self._settings.ols_base_url
+        self._client = acquire_client(
+            self._settings,
+            self._base_url,
             timeout=self._settings.ols_timeout,
             headers={"Accept": "application/json"},
         )
+        self._cache: ResponseCache | None = (
+            ResponseCache(
+                self._settings.response_cache_path, self._settings.response_cache_ttl_days
+            )
+            if self._settings.response_cache_path
+            else None
+        )
+        # Searches answered with no results because the request failed, so callers
+        # can tell an outage from a genuine miss
+        self.failed_searches = 0
 
     async def close(self) -> None:
-        await self._client.aclose()
+        await release_client(self._client)
+        if self._cache is not None:
+            self._cache.close()
 
     async def __aenter__(self) -> OLSClient:
         return self
@@ -35,13 +56,25 @@ class OLSClient:
     async def __aexit__(self, *args: Any) -> None:
         await self.close()
 
+    async def _get(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+        """GET `path`, served from the persistent response cache when enabled."""
+        if self._cache is None:
+            return await self._fetch(path, params)
+        key = ResponseCache.make_key(f"{self._base_url}{path}", params)
+        cached = await self._cache.get(key)
+        if cached is not None:
+            return cached
+        data = await self._fetch(path, params)
+        await self._cache.set(key, data)
+        return data
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=10),
         retry=retry_if_exception_type((httpx.TimeoutException, httpx.ConnectError)),
         reraise=True,
     )
-    async def _get(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+    async def _fetch(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
         url = f"{self._base_url}{path}"
         try:
             response = await self._client.get(url, params=params)
@@ -54,17 +87,13 @@ class OLSClient:
         except Exception as exc:
             raise OLSError(f"OLS request failed: {exc}") from exc
 
-    async def search(
+    def _search_params(
         self,
         query: str,
-        ontologies: list[str] | None = None,
-        exact: bool = False,
-        rows: int | None = None,
-    ) -> list[dict[str, Any]]:
-        """Search OLS for terms matching `query`.
-
-        Returns a list of raw term dicts from OLS response docs.
-        """
+        ontologies: Sequence[str] | None,
+        exact: bool,
+        rows: int | None,
+    ) -> dict[str, Any]:
         # OLS4 only returns synonym/description data when explicitly requested via fieldList
         params: dict[str, Any] = {
             "q": query,
@@ -77,11 +106,25 @@ class OLSClient:
             params["ontology"] = ",".join(ontologies)
         if exact:
             params["exact"] = "true"
+        return params
+
+    async def search(
+        self,
+        query: str,
+        ontologies: Sequence[str] | None = None,
+        exact: bool = False,
+        rows: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Search OLS for terms matching `query`.
 
+        Returns a list of raw term dicts from OLS response docs.
+        """
+        params = self._search_params(query, ontologies, exact, rows)
         try:
             data = await self._get("/search", params)
         except OLSError:
             logger.warning("OLS search failed for query=%r", query)
+            self.failed_searches += 1
             return []
 
         docs: list[dict[str, Any]] = (
@@ -95,70 +138,121 @@ class OLSClient:
         results = await self.search(iri_or_id, ontologies=[ontology], exact=True, rows=1)
         return results[0] if results else None
 
+    async def find_by_id(self, curie: str) -> list[dict[str, Any]]:
+        """Return the term whose OBO ID is `curie` (e.g. ``MONDO:0005015``)."""
+        ontology = curie.split(":", 1)[0].lower()
+        doc = await self.get_term(ontology, curie)
+        if doc and (doc.get("obo_id") or "").lower() == curie.lower():
+            return [self._parse_term(doc)]
+        return []
+
     def _parse_term(self, doc: dict[str, Any]) -> dict[str, Any]:
         """Normalise a raw OLS doc into a cleaner dict."""
-        description = doc.get("description")
+        get = doc.get
+
+        description = get("description")
         if isinstance(description, list):
             description = description[0] if description else None
 
-        synonyms: list[str] = doc.get("synonym", []) or []
+        synonyms: list[str] = get("synonym") or []
         if isinstance(synonyms, str):
             synonyms = [synonyms]
 
         # Cross-references from obo_xref
-        cross_refs: dict[str, str] = {}
-        for xref in doc.get("obo_xref", []) or []:
-            if isinstance(xref, dict):
-                db = xref.get("database", "").lower()
-                acc = xref.get("id", "")
-                if db and acc:
-                    cross_refs[db] = f"{db.upper()}:{acc}"
-
-        obo_id: str = doc.get("obo_id") or doc.get("short_form") or ""
+        cross_refs: dict[str, str] = {
+            db.lower(): f"{db.upper()}:{acc}"
+            for xref in get("obo_xref") or ()
+            if isinstance(xref, dict) and (db := xref.get("database")) and (acc := xref.get("id"))
+        }
 
         return {
-            "term_id": obo_id,
-            "label": doc.get("label", ""),
-            "ontology": doc.get("ontology_name", ""),
+            "term_id": get("obo_id") or get("short_form") or "",
+            "label": get("label", ""),
+            "ontology": get("ontology_name", ""),
             "definition": description,
             "synonyms": synonyms,
-            "iri": doc.get("iri", ""),
+            "iri": get("iri", ""),
             "cross_references": cross_refs,
         }
 
     async def find_exact(
-        self, query: str, ontologies: list[str] | None = None
+        self, query: str, ontologies: Sequence[str] | None = None
     ) -> list[dict[str, Any]]:
         """Return terms where label exactly matches `query` (case-insensitive)."""
         docs = await self.search(query, ontologies=ontologies, exact=True)
         query_lower = query.lower()
-        results = []
-        for doc in docs:
+        return [
+            self._parse_term(doc) for doc in docs if (doc.get("label") or "").lower() == query_lower
+        ]
+
+    async def find_exact_bulk(
+        self, queries: list[str], ontologies: Sequence[str] | None = None
+    ) -> dict[str, list[dict[str, Any]]] | None:
+        """Exact-label lookup for many queries in a few OLS requests.
+
+        Queries are sent as OR-ed phrases, at most `BULK_EXACT_BATCH_SIZE` per
+        request so the query string and row count stay bounded. Returns a mapping
+        of lowercased query to its exact-label matches (queries without a hit are
+        absent), or None if every request failed.
+        """
+        wanted = list(dict.fromkeys(q.lower() for q in queries))
+        if not wanted:
+            return {}
+        batches = await asyncio.gather(
+            *(
+                self._find_exact_batch(wanted[i : i + BULK_EXACT_BATCH_SIZE], ontologies)
+                for i in range(0, len(wanted), BULK_EXACT_BATCH_SIZE)
+            )
+        )
+        if all(batch is None for batch in batches):
+            return None
+        results: dict[str, list[dict[str, Any]]] = {}
+        for batch in batches:
+            results.update(batch or {})
+        return results
+
+    async def _find_exact_batch(
+        self, wanted: list[str], ontologies: Sequence[str] | None
+    ) -> dict[str, list[dict[str, Any]]] | None:
+        phrases = (q.replace("\\", "\\\\").replace('"', '\\"') for q in wanted)
+        query = " OR ".join(f'"{p}"' for p in phrases)
+        params = self._search_params(
+            query, ontologies, exact=True, rows=len(wanted) * self._settings.ols_max_results
+        )
+        try:
+            data = await self._get("/search", params)
+        except OLSError:
+            logger.warning("OLS bulk exact search failed for %d queries", len(wanted))
+            return None
+
+        wanted_set = set(wanted)
+        results: dict[str, list[dict[str, Any]]] = {}
+        for doc in data.get("response", {}).get("docs", []):
             label = (doc.get("label") or "").lower()
-            if label == query_lower:
-                results.append(self._parse_term(doc))
+            if label in wanted_set:
+                results.setdefault(label, []).append(self._parse_term(doc))
         return results
 
     async def find_by_synonym(
-        self, query: str, ontologies: list[str] | None = None
+        self, query: str, ontologies: Sequence[str] | None = None
     ) -> list[dict[str, Any]]:
         """Return terms where a synonym exactly matches `query` (case-insensitive)."""
         docs = await self.search(query, ontologies=ontologies, exact=False)
         query_lower = query.lower()
         results = []
         for doc in docs:
-            synonyms = doc.get("synonym", []) or []
+            # Label matches are Stage 1's job; skip them before touching synonyms
+            if (doc.get("label") or "").lower() == query_lower:
+                continue
+            synonyms = doc.get("synonym") or []
             if isinstance(synonyms, str):
                 synonyms = [synonyms]
             if any(s.lower() == query_lower for s in synonyms):
-                # Ensure label doesn't already match (avoid duplicates)
-                label = (doc.get("label") or "").lower()
-                if label != query_lower:
-                    results.append(self._parse_term(doc))
+                results.append(self._parse_term(doc))
         return results
 
     async def fuzzy_search(
-        self, query: str, ontologies: list[str] | None = None
+        self, query: str, ontologies: Sequence[str] | None = None
     ) -> list[dict[str, Any]]:
         """Return top OLS search results for a free-text query."""
         docs = await self.search(query, ontologies=ontologies, exact=False)
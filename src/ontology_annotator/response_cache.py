@@ -0,0 +1,88 @@
+"""Persistent SQLite cache for OLS/BioPortal API responses."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from . import serialization
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Key/value store of JSON responses with a time-to-live.
+
+    Keys are short blake2b digests of the request URL and sorted params. SQLite
+    calls run in a worker thread so they never block the event loop.
+    """
+
+    def __init__(self, path: str | Path, ttl_days: float) -> None:
+        self._path = Path(path).expanduser()
+        self._ttl_seconds = ttl_days * 86400
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(url: str, params: dict[str, Any] | None) -> bytes:
+        raw = serialization.dumps([url, sorted((params or {}).items())])
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self._path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key BLOB PRIMARY KEY, created REAL NOT NULL, body TEXT NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _get_sync(self, key: bytes) -> Any | None:
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT created, body FROM responses WHERE key = ?", (key,))
+                .fetchone()
+            )
+        if row is None or time.time() - row[0] > self._ttl_seconds:
+            return None
+        return serialization.loads(row[1])
+
+    def _set_sync(self, key: bytes, value: Any) -> None:
+        body = serialization.dumps(value)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, created, body) VALUES (?, ?, ?)",
+                (key, time.time(), body),
+            )
+            conn.commit()
+
+    async def get(self, key: bytes) -> Any | None:
+        """Return the cached response, or None on a miss, expiry or cache error."""
+        try:
+            return await asyncio.to_thread(self._get_sync, key)
+        except (sqlite3.Error, OSError, ValueError) as exc:
+            logger.warning("Response cache read failed (%s): %s", self._path, exc)
+            return None
+
+    async def set(self, key: bytes, value: Any) -> None:
+        try:
+            await asyncio.to_thread(self._set_sync, key, value)
+        except (sqlite3.Error, OSError, TypeError) as exc:
+            logger.warning("Response cache write failed (%s): %s", self._path, exc)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,22 @@
+"""JSON encoding/decoding backed by orjson."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+
+# Subclasses json.JSONDecodeError, so callers may catch either
+JSONDecodeError = orjson.JSONDecodeError
+
+# Non-string dict keys (e.g. ints) are coerced rather than raising TypeError
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def loads(data: str | bytes) -> Any:
+    return orjson.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Serialize `obj` to a compact JSON string (non-ASCII kept as-is)."""
+    return orjson.dumps(obj, option=_OPTIONS).decode("utf-8")
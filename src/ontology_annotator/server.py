@@ -3,21 +3,46 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
+import sys
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any
 
+import fastjsonschema
+import httpx
+import msgspec
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
 
 from .annotator import OntologyAnnotator
+from .bioportal_client import BioPortalError
 from .config import VALID_DOMAINS, Settings, get_settings
 from .extractor import EntityExtractor, ExtractionError
+from .ols_client import OLSError
+
+try:
+    import uvloop
+except ImportError:  # optional speed-up; not available on Windows
+    uvloop = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Computed once: frozenset iteration order varies between runs, and the error
+# message is otherwise rebuilt on every invalid request
+_VALID_DOMAINS_SORTED = sorted(VALID_DOMAINS)
+_INVALID_DOMAIN_TMPL = f"Invalid domain '{{}}'. Valid domains: {_VALID_DOMAINS_SORTED}"
+
+# extract_and_annotate responses with more entities than this are split into
+# several TextContent items of _RESPONSE_CHUNK_SIZE entities each
+_CHUNKED_RESPONSE_THRESHOLD = 32
+_RESPONSE_CHUNK_SIZE = 16
+
+# Upstream failures we expect under load or outages; logged without a traceback
+_EXPECTED_ERRORS = (httpx.HTTPError, TimeoutError, OLSError, BioPortalError, ExtractionError)
+
 # ---------------------------------------------------------------------------
 # Tool schemas
 # ---------------------------------------------------------------------------
@@ -40,7 +65,7 @@ ANNOTATE_TOOL = Tool(
             },
             "domain": {
                 "type": "string",
-                "enum": list(VALID_DOMAINS),
+                "enum": _VALID_DOMAINS_SORTED,
                 "description": "Biomedical domain (optional; narrows ontology search)",
             },
             "preferred_ontologies": {
@@ -82,7 +107,7 @@ EXTRACT_TOOL = Tool(
                 "type": "array",
                 "items": {
                     "type": "string",
-                    "enum": list(VALID_DOMAINS),
+                    "enum": _VALID_DOMAINS_SORTED,
                 },
                 "description": "Entity types to extract (defaults to all domains)",
             },
@@ -107,26 +132,129 @@ EXTRACT_TOOL = Tool(
     },
 )
 
+BATCH_ANNOTATE_TOOL = Tool(
+    name="batch_annotate",
+    description=(
+        "Run several annotate_ontology_terms requests in one call. "
+        "Use when you have many independent term sets to annotate."
+    ),
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "requests": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": ANNOTATE_TOOL.inputSchema["properties"],
+                    "required": ["texts"],
+                },
+                "description": "annotate_ontology_terms arguments, one object per request",
+            },
+            "max_concurrent": {
+                "type": "integer",
+                "default": 16,
+                "minimum": 1,
+                "description": "Maximum number of requests processed at once",
+            },
+        },
+        "required": ["requests"],
+    },
+)
+
+TOOLS = [ANNOTATE_TOOL, EXTRACT_TOOL, BATCH_ANNOTATE_TOOL]
+
+# Argument validators generated once from the schemas above; they also fill in
+# schema defaults
+_VALIDATORS = {tool.name: fastjsonschema.compile(tool.inputSchema) for tool in TOOLS}
+
+
+# ---------------------------------------------------------------------------
+# Response records
+# ---------------------------------------------------------------------------
+
+
+class AnnotatedEntity(msgspec.Struct):
+    text: str
+    start_pos: int
+    end_pos: int
+    domain: str
+    extraction_confidence: float
+    matches: list[dict[str, Any]]
+
+
+# Encodes plain containers and msgspec Structs (e.g. AnnotatedEntity) directly
+_ENCODER = msgspec.json.Encoder()
+
 
 # ---------------------------------------------------------------------------
 # Handler helpers
 # ---------------------------------------------------------------------------
 
 
-def _parse_texts(raw: Any) -> list[str]:
-    if isinstance(raw, str):
-        return [raw]
-    if isinstance(raw, list):
-        return [str(t) for t in raw]
-    raise ValueError(f"'texts' must be a string or list of strings, got {type(raw).__name__}")
+def _parse_texts(raw: str | list[str]) -> list[str]:
+    # Shape already checked against the tool schema
+    return [raw] if isinstance(raw, str) else raw
+
 
+def _dumps(data: Any, settings: Settings) -> str:
+    # Compact unless PRETTY_JSON is set; indentation roughly doubles payload size
+    raw = _ENCODER.encode(data)
+    if settings.pretty_json:
+        raw = msgspec.json.format(raw, indent=2)
+    return raw.decode("utf-8")
 
-def _json_response(data: Any) -> list[TextContent]:
-    return [TextContent(type="text", text=json.dumps(data, ensure_ascii=False, indent=2))]
 
+def _json_response(data: Any, settings: Settings) -> list[TextContent]:
+    return [TextContent(type="text", text=_dumps(data, settings))]
 
-def _error_response(message: str) -> list[TextContent]:
-    return _json_response({"error": message})
+
+def _chunked_entities_response(
+    entities: list[AnnotatedEntity], original_text: str, settings: Settings
+) -> list[TextContent]:
+    """Serialize a large entity list as several smaller TextContent items.
+
+    `original_text` is sent once, in the first chunk.
+    """
+    starts = range(0, len(entities), _RESPONSE_CHUNK_SIZE)
+    chunks: list[TextContent] = []
+    for i, start in enumerate(starts):
+        payload: dict[str, Any] = {
+            "chunk": i,
+            "total_chunks": len(starts),
+            "extracted_entities": entities[start : start + _RESPONSE_CHUNK_SIZE],
+        }
+        if i == 0:
+            payload["original_text"] = original_text
+        chunks.append(TextContent(type="text", text=_dumps(payload, settings)))
+    return chunks
+
+
+def _error_response(message: str, settings: Settings) -> list[TextContent]:
+    return _json_response({"error": message}, settings)
+
+
+async def _cancel_pending(tasks: list[asyncio.Task[Any]]) -> None:
+    """Cancel unfinished tasks and wait for them to exit.
+
+    A portable stand-in for asyncio.TaskGroup's cancel-on-exit (Python 3.11+):
+    after a failure, sibling lookups stop promptly and release their pooled
+    connections instead of running on after the handler has returned.
+    """
+    pending = [task for task in tasks if not task.done()]
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    for task in tasks:
+        if not task.cancelled():
+            task.exception()  # mark as retrieved so asyncio does not warn
+
+
+def _log_expected_failure(message: str, exc: BaseException) -> None:
+    # Formatting a traceback is comparatively costly; only do it when debugging
+    logger.warning(
+        "%s: %s", message, exc, exc_info=exc if logger.isEnabledFor(logging.DEBUG) else None
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -136,115 +264,188 @@ def _error_response(message: str) -> list[TextContent]:
 
 def create_server() -> Server:
     settings = get_settings()
-    app = Server("ontology-annotator")
+    # One annotator for the server's lifetime so its HTTP connection pools and
+    # result cache are reused across tool calls
+    annotator = OntologyAnnotator(settings)
+    # Likewise one Anthropic client; without an API key the extract tool reports
+    # the configuration error instead
+    extractor: EntityExtractor | None = None
+    extractor_error = ""
+    try:
+        extractor = EntityExtractor(settings)
+    except ExtractionError as exc:
+        extractor_error = str(exc)
+
+    @asynccontextmanager
+    async def lifespan(_server: Server) -> AsyncIterator[dict[str, Any]]:
+        async with annotator:
+            try:
+                yield {"annotator": annotator, "extractor": extractor}
+            finally:
+                if extractor is not None:
+                    await extractor.close()
+
+    app = Server("ontology-annotator", lifespan=lifespan)
 
     @app.list_tools()
     async def list_tools() -> list[Tool]:
-        return [ANNOTATE_TOOL, EXTRACT_TOOL]
+        return TOOLS
 
-    @app.call_tool()
+    # Arguments are checked with the precompiled validators instead of the SDK's
+    # per-call jsonschema validation
+    @app.call_tool(validate_input=False)
     async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
+        validate = _VALIDATORS.get(name)
+        if validate is not None:
+            try:
+                arguments = validate(arguments)
+            except fastjsonschema.JsonSchemaValueException as exc:
+                return _error_response(f"Input validation error: {exc.message}", settings)
         if name == "annotate_ontology_terms":
-            return await _handle_annotate(arguments, settings)
+            return await _handle_annotate(arguments, settings, annotator)
         if name == "extract_and_annotate":
-            return await _handle_extract(arguments, settings)
-        return _error_response(f"Unknown tool: {name}")
+            if extractor is None:
+                return _error_response(extractor_error, settings)
+            return await _handle_extract(arguments, settings, annotator, extractor)
+        if name == "batch_annotate":
+            return await _handle_batch_annotate(arguments, settings, annotator)
+        return _error_response(f"Unknown tool: {name}", settings)
 
     return app
 
 
-async def _handle_annotate(
-    args: dict[str, Any], settings: Settings
-) -> list[TextContent]:
-    try:
-        texts = _parse_texts(args.get("texts"))
-    except ValueError as exc:
-        return _error_response(str(exc))
-
+async def _annotate_payload(
+    args: dict[str, Any], annotator: OntologyAnnotator
+) -> dict[str, Any]:
+    """Run one annotate_ontology_terms request, returning its JSON payload."""
+    texts = _parse_texts(args["texts"])
+    if not texts:
+        return {"annotations": []}
     domain: str | None = args.get("domain")
     preferred_ontologies: list[str] | None = args.get("preferred_ontologies")
     use_bioportal_fallback: bool = bool(args.get("use_bioportal_fallback", True))
     min_confidence: float = float(args.get("min_confidence", 0.7))
 
     if domain and domain not in VALID_DOMAINS:
-        return _error_response(
-            f"Invalid domain '{domain}'. Valid domains: {sorted(VALID_DOMAINS)}"
-        )
+        return {"error": _INVALID_DOMAIN_TMPL.format(domain)}
 
     try:
-        async with OntologyAnnotator(settings) as annotator:
-            annotations = await annotator.annotate_batch(
-                texts,
-                domain=domain,
-                preferred_ontologies=preferred_ontologies,
-                use_bioportal_fallback=use_bioportal_fallback,
-                min_confidence=min_confidence,
-            )
+        annotations = await annotator.annotate_batch(
+            texts,
+            domain=domain,
+            preferred_ontologies=preferred_ontologies,
+            use_bioportal_fallback=use_bioportal_fallback,
+            min_confidence=min_confidence,
+        )
+    except _EXPECTED_ERRORS as exc:
+        _log_expected_failure("annotate_ontology_terms failed", exc)
+        return {"error": f"Annotation failed: {exc}"}
     except Exception as exc:
         logger.exception("annotate_ontology_terms failed")
-        return _error_response(f"Annotation failed: {exc}")
+        return {"error": f"Annotation failed: {exc}"}
 
-    return _json_response({"annotations": annotations})
+    return {"annotations": annotations}
+
+
+async def _handle_annotate(
+    args: dict[str, Any], settings: Settings, annotator: OntologyAnnotator
+) -> list[TextContent]:
+    return _json_response(await _annotate_payload(args, annotator), settings)
+
+
+async def _handle_batch_annotate(
+    args: dict[str, Any], settings: Settings, annotator: OntologyAnnotator
+) -> list[TextContent]:
+    sem = asyncio.Semaphore(args.get("max_concurrent", 16))
+
+    async def _run_one(item: dict[str, Any]) -> dict[str, Any]:
+        async with sem:
+            return await _annotate_payload(item, annotator)
+
+    # A failing request reports its own error without aborting the others
+    results = await asyncio.gather(*(_run_one(r) for r in args["requests"]), return_exceptions=True)
+    return _json_response(
+        {
+            "results": [
+                {"error": str(r)} if isinstance(r, Exception) else r for r in results
+            ]
+        },
+        settings,
+    )
 
 
 async def _handle_extract(
-    args: dict[str, Any], settings: Settings
+    args: dict[str, Any],
+    settings: Settings,
+    annotator: OntologyAnnotator,
+    extractor: EntityExtractor,
 ) -> list[TextContent]:
     text: str = args.get("text", "")
     if not text:
-        return _error_response("'text' is required and must not be empty")
+        return _error_response("'text' is required and must not be empty", settings)
 
     domains: list[str] | None = args.get("domains")
     preferred_ontologies: dict[str, list[str]] | None = args.get("preferred_ontologies")
     use_bioportal_fallback: bool = bool(args.get("use_bioportal_fallback", True))
     min_confidence: float = float(args.get("min_confidence", 0.7))
 
-    # Step 1: extract entities with LLM
-    try:
-        extractor = EntityExtractor(settings)
-    except ExtractionError as exc:
-        return _error_response(str(exc))
+    # Annotate entities concurrently, bounded to respect API rate limits
+    sem = asyncio.Semaphore(max(settings.max_concurrent_annotations, 1))
 
-    try:
-        entities = await extractor.extract(text, domains=domains)
-    except ExtractionError as exc:
-        logger.exception("Entity extraction failed")
-        return _error_response(f"Entity extraction failed: {exc}")
+    # Resolved once so each task is a single dict lookup with no branching
+    preferred_by_domain: dict[str, list[str]] = preferred_ontologies or {}
 
-    if not entities:
-        return _json_response({"extracted_entities": [], "original_text": text})
+    async def _annotate_one(entity: dict[str, Any]) -> AnnotatedEntity:
+        domain = entity["domain"]
+        per_domain_onto = preferred_by_domain.get(domain)
+        async with sem:
+            result = await annotator.annotate(
+                entity["text"],
+                domain=domain,
+                preferred_ontologies=per_domain_onto,
+                use_bioportal_fallback=use_bioportal_fallback,
+                min_confidence=min_confidence,
+            )
+        return AnnotatedEntity(
+            text=entity["text"],
+            start_pos=entity["start_pos"],
+            end_pos=entity["end_pos"],
+            domain=domain,
+            extraction_confidence=entity["extraction_confidence"],
+            matches=result["matches"],
+        )
 
-    # Step 2: annotate each entity
+    # Stream entities from the LLM, starting each annotation as soon as
+    # its entity arrives so lookups overlap the remaining generation. Whatever
+    # happens, no task outlives this handler (see _cancel_pending).
+    tasks: list[asyncio.Task[AnnotatedEntity]] = []
     try:
-        async with OntologyAnnotator(settings) as annotator:
-            annotated_entities = []
-            for entity in entities:
-                domain = entity["domain"]
-                per_domain_onto = (
-                    preferred_ontologies.get(domain) if preferred_ontologies else None
-                )
-                result = await annotator.annotate(
-                    entity["text"],
-                    domain=domain,
-                    preferred_ontologies=per_domain_onto,
-                    use_bioportal_fallback=use_bioportal_fallback,
-                    min_confidence=min_confidence,
-                )
-                annotated_entities.append(
-                    {
-                        "text": entity["text"],
-                        "start_pos": entity["start_pos"],
-                        "end_pos": entity["end_pos"],
-                        "domain": domain,
-                        "extraction_confidence": entity["extraction_confidence"],
-                        "matches": result["matches"],
-                    }
-                )
-    except Exception as exc:
-        logger.exception("Annotation step in extract_and_annotate failed")
-        return _error_response(f"Annotation failed: {exc}")
-
-    return _json_response({"extracted_entities": annotated_entities, "original_text": text})
+        try:
+            async for entity in extractor.extract_stream(text, domains=domains):
+                tasks.append(asyncio.create_task(_annotate_one(entity)))
+        except ExtractionError as exc:
+            _log_expected_failure("Entity extraction failed", exc)
+            return _error_response(f"Entity extraction failed: {exc}", settings)
+
+        if not tasks:
+            return _json_response({"extracted_entities": [], "original_text": text}, settings)
+
+        try:
+            annotated_entities = await asyncio.gather(*tasks)
+        except Exception as exc:
+            if isinstance(exc, _EXPECTED_ERRORS):
+                _log_expected_failure("Annotation step in extract_and_annotate failed", exc)
+            else:
+                logger.exception("Annotation step in extract_and_annotate failed")
+            return _error_response(f"Annotation failed: {exc}", settings)
+    finally:
+        await _cancel_pending(tasks)
+
+    if len(annotated_entities) > _CHUNKED_RESPONSE_THRESHOLD:
+        return _chunked_entities_response(annotated_entities, text, settings)
+    return _json_response(
+        {"extracted_entities": annotated_entities, "original_text": text}, settings
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -260,7 +461,15 @@ def main() -> None:
         async with stdio_server() as (read_stream, write_stream):
             await app.run(read_stream, write_stream, app.create_initialization_options())
 
-    asyncio.run(_run())
+    # Use uvloop's faster event loop when installed (not available on Windows)
+    if uvloop is None:
+        asyncio.run(_run())
+    elif sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            runner.run(_run())
+    else:
+        uvloop.install()
+        asyncio.run(_run())
 
 
 if __name__ == "__main__":
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 from unittest.mock import AsyncMock, patch
 
 import httpx
@@ -11,6 +13,7 @@ import pytest_httpx
 from ontology_annotator.annotator import OntologyAnnotator, OntologyMatch, _deduplicate
 from ontology_annotator.config import Settings
 from ontology_annotator.extractor import EntityExtractor, ExtractionError
+from ontology_annotator.local_index import LocalExactIndex
 from ontology_annotator.ols_client import OLSClient
 
 # ---------------------------------------------------------------------------
@@ -54,6 +57,15 @@ def test_deduplicate_removes_duplicates():
     assert result[0].match_type == "exact_label"
 
 
+def test_deduplicate_keeps_best_match_per_term():
+    fuzzy = OntologyMatch("MONDO:0005015", "diabetes mellitus", "mondo", "ols_search", 0.75)
+    exact = OntologyMatch("MONDO:0005015", "diabetes mellitus", "mondo", "exact_label", 0.98)
+    syn = OntologyMatch("MONDO:0005015", "diabetes mellitus", "mondo", "synonym", 0.98)
+    result = _deduplicate([fuzzy, syn, exact])
+    assert len(result) == 1
+    assert result[0].match_type == "exact_label"
+
+
 def test_deduplicate_keeps_different_ontologies():
     m1 = OntologyMatch("MONDO:0005015", "diabetes mellitus", "mondo", "exact_label", 0.98)
     m2 = OntologyMatch("DOID:9351", "diabetes mellitus", "doid", "exact_label", 0.98)
@@ -137,8 +149,68 @@ async def test_annotate_min_confidence_filters(settings):
         async with OntologyAnnotator(settings) as annotator:
             # OLS search returns confidence 0.75; min_confidence of 0.8 should filter it
             result = await annotator.annotate("something", min_confidence=0.8)
+            # Thresholds are rounded to 3 places for filtering as well as caching
+            rounded = await annotator.annotate("something", min_confidence=0.7500001)
 
     assert result["matches"] == []
+    assert [m["term_id"] for m in rounded["matches"]] == ["X:001"]
+
+
+@pytest.mark.asyncio
+async def test_annotate_reranks_by_label_similarity(settings):
+    pytest.importorskip("rapidfuzz")
+    fuzzy_results = [
+        {"term_id": "MONDO:0004335", "label": "digestive system disease", "ontology": "mondo"},
+        {"term_id": "MONDO:0005015", "label": "diabetes mellitus", "ontology": "mondo"},
+    ]
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.find_exact = AsyncMock(return_value=[])
+        mock_ols.find_by_synonym = AsyncMock(return_value=[])
+        mock_ols.fuzzy_search = AsyncMock(return_value=fuzzy_results)
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            result = await annotator.annotate("diabetes melitus", min_confidence=0.0)
+
+    matches = result["matches"]
+    assert [m["term_id"] for m in matches] == ["MONDO:0005015", "MONDO:0004335"]
+    # Re-ranking orders matches but keeps their stage confidence
+    assert [m["confidence"] for m in matches] == [0.75, 0.75]
+
+
+@pytest.mark.asyncio
+async def test_annotate_rerank_keeps_synonym_hits_at_default_threshold(settings):
+    pytest.importorskip("rapidfuzz")
+    synonym_results = [
+        {
+            "term_id": "DOID:5844",
+            "label": "myocardial infarction",
+            "ontology": "doid",
+            "synonyms": ["heart attack"],
+        },
+        {
+            "term_id": "MONDO:0005068",
+            "label": "myocardial infarction",
+            "ontology": "mondo",
+            "synonyms": ["heart attack"],
+        },
+    ]
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.find_exact = AsyncMock(return_value=[])
+        mock_ols.find_by_synonym = AsyncMock(return_value=synonym_results)
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            result = await annotator.annotate("heart attack", domain="disease")
+
+    assert [(m["term_id"], m["confidence"]) for m in result["matches"]] == [
+        ("DOID:5844", 0.85),
+        ("MONDO:0005068", 0.85),
+    ]
 
 
 @pytest.mark.asyncio
@@ -162,6 +234,200 @@ async def test_annotate_batch_returns_list(settings, mock_ols_exact_result):
         assert "matches" in r
 
 
+@pytest.mark.asyncio
+async def test_annotate_caches_repeat_queries(settings, mock_ols_exact_result):
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.find_exact = AsyncMock(return_value=mock_ols_exact_result)
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            first = await annotator.annotate("diabetes mellitus", domain="disease")
+            first["matches"].clear()
+            second = await annotator.annotate("Diabetes Mellitus", domain="disease")
+            await annotator.annotate("diabetes mellitus", domain="disease", min_confidence=0.70001)
+            batch = await annotator.annotate_batch(
+                ["aspirin", "ASPIRIN", "aspirin"], domain="chemical"
+            )
+            assert await annotator.annotate_batch([], domain="chemical") == []
+
+    # One lookup per distinct (case-insensitive) query; callers get private copies
+    assert mock_ols.find_exact.await_count == 2
+    assert second["input_text"] == "Diabetes Mellitus"
+    assert second["matches"][0]["term_id"] == "MONDO:0005015"
+    assert [r["input_text"] for r in batch] == ["aspirin", "ASPIRIN", "aspirin"]
+
+
+@pytest.mark.asyncio
+async def test_annotate_does_not_join_a_lookup_being_cancelled(settings, mock_ols_exact_result):
+    started = asyncio.Event()
+    release = asyncio.Event()
+    calls = 0
+
+    async def find_exact(text, ontologies=None):
+        nonlocal calls
+        calls += 1
+        if calls > 1:
+            return mock_ols_exact_result
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            await release.wait()  # slow cleanup keeps the task alive while cancelling
+            raise
+
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.find_exact = find_exact
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            first = asyncio.ensure_future(annotator.annotate("diabetes mellitus"))
+            await started.wait()
+            first.cancel()
+            await asyncio.sleep(0)
+
+            second = asyncio.ensure_future(annotator.annotate("diabetes mellitus"))
+            await asyncio.sleep(0)
+            release.set()
+            result = await second
+
+    assert first.cancelled()
+    assert result["matches"][0]["term_id"] == "MONDO:0005015"
+
+
+@pytest.mark.asyncio
+async def test_annotate_prefilters_and_looks_up_curies(settings, mock_ols_exact_result):
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.find_by_id = AsyncMock(return_value=mock_ols_exact_result)
+        mock_ols.find_exact = AsyncMock(return_value=mock_ols_exact_result)
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            trivial = [await annotator.annotate(t) for t in ("the", "42", "x")]
+            by_id = await annotator.annotate("MONDO:0005015", domain="disease")
+            mock_ols.find_exact.assert_not_awaited()
+            # Upper-case abbreviations are not stopwords
+            abbreviation = await annotator.annotate("AS", domain="disease")
+
+    assert all(r["matches"] == [] for r in trivial)
+    mock_ols.find_by_id.assert_awaited_once_with("MONDO:0005015")
+    mock_ols.find_exact.assert_awaited_once()
+    assert abbreviation["matches"][0]["term_id"] == "MONDO:0005015"
+    assert by_id["matches"][0]["match_type"] == "exact_id"
+    assert by_id["matches"][0]["confidence"] == 0.99
+
+
+@pytest.mark.asyncio
+async def test_annotate_batch_answers_stopwords_regardless_of_order(
+    settings, mock_ols_exact_result
+):
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.find_exact = AsyncMock(return_value=mock_ols_exact_result)
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            forward = await annotator.annotate_batch(["as", "AS"], domain="disease")
+            backward = await annotator.annotate_batch(["AS", "as"], domain="disease")
+
+    # "as" is a stopword, "AS" an abbreviation that is looked up either way
+    assert [len(r["matches"]) for r in forward] == [0, 1]
+    assert [len(r["matches"]) for r in backward] == [1, 0]
+    assert mock_ols.find_exact.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_annotate_speculates_for_likely_misses(settings, mock_ols_exact_result):
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.find_exact = AsyncMock(return_value=[])
+        mock_ols.find_by_synonym = AsyncMock(return_value=mock_ols_exact_result)
+        mock_ols.fuzzy_search = AsyncMock(return_value=[])
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            result = await annotator.annotate("diabetes (type 2), adult onset", domain="disease")
+
+    # All three OLS stages were issued together, but stage order still decides
+    assert mock_ols.fuzzy_search.await_count == 1
+    assert [m["match_type"] for m in result["matches"]] == ["synonym"]
+
+
+@pytest.mark.asyncio
+async def test_annotate_batch_skips_speculation_for_bulk_hits(settings, mock_ols_exact_result):
+    texts = ["diabetes (type 2), adult onset", "asthma (childhood), severe"]
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.find_exact_bulk = AsyncMock(
+            return_value={t.lower(): mock_ols_exact_result for t in texts}
+        )
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            results = await annotator.annotate_batch(texts, domain="disease")
+
+    assert [r["matches"][0]["match_type"] for r in results] == ["exact_label"] * 2
+    mock_ols.find_by_synonym.assert_not_called()
+    mock_ols.fuzzy_search.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_bioportal_fallback_uses_domain_acronyms(httpx_mock):
+    httpx_mock.add_response(json={"collection": []}, is_reusable=True)
+    settings = Settings(
+        bioportal_api_key="bp-key", default_disease_ontologies="mondo,orphanet"
+    )
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.find_exact = AsyncMock(return_value=[])
+        mock_ols.find_by_synonym = AsyncMock(return_value=[])
+        mock_ols.fuzzy_search = AsyncMock(return_value=[])
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            await annotator.annotate("unknownitis", domain="disease")
+
+    for request in httpx_mock.get_requests():
+        assert request.url.params["ontologies"] == "MONDO,ORPHANET"
+
+
+@pytest.mark.asyncio
+async def test_annotate_batch_uses_bulk_exact_lookup(settings, mock_ols_exact_result):
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.find_exact_bulk = AsyncMock(
+            return_value={"diabetes mellitus": mock_ols_exact_result}
+        )
+        mock_ols.find_exact = AsyncMock(return_value=[])
+        mock_ols.find_by_synonym = AsyncMock(return_value=[])
+        mock_ols.fuzzy_search = AsyncMock(return_value=[])
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            results = await annotator.annotate_batch(
+                ["diabetes mellitus", "unknownitis"], domain="disease"
+            )
+
+    assert results[0]["matches"][0]["match_type"] == "exact_label"
+    assert results[1]["matches"] == []
+    mock_ols.find_exact_bulk.assert_awaited_once()
+    # The bulk hit skips per-term Stage 1; the term absent from the bulk response
+    # is not trusted as a miss and gets its own exact lookup
+    mock_ols.find_exact.assert_awaited_once()
+    assert mock_ols.find_exact.await_args.args[0] == "unknownitis"
+    assert mock_ols.find_by_synonym.await_count == 1
+
+
 # ---------------------------------------------------------------------------
 # Unit tests: EntityExtractor
 # ---------------------------------------------------------------------------
@@ -202,6 +468,19 @@ def test_extractor_parse_markdown_fenced_json():
     assert result[0]["domain"] == "chemical"
 
 
+def test_extractor_parse_fenced_json_after_prose():
+    settings = Settings(anthropic_api_key="test-key")
+    with patch("anthropic.AsyncAnthropic"):
+        extractor = EntityExtractor(settings)
+
+    content = """Here are the entities:
+```JSON
+[{"text": "aspirin", "start_pos": 0, "end_pos": 7, "domain": "chemical", "confidence": 0.9}]
+```"""
+    result = extractor._parse_response(content, "aspirin")
+    assert [e["text"] for e in result] == ["aspirin"]
+
+
 def test_extractor_parse_invalid_json_returns_empty():
     settings = Settings(anthropic_api_key="test-key")
     with patch("anthropic.AsyncAnthropic"):
@@ -224,6 +503,78 @@ def test_extractor_skips_invalid_domain():
     assert result == []
 
 
+class _FakeTextStream:
+    def __init__(self, chunks: list[str]) -> None:
+        self._chunks = chunks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+    @property
+    async def text_stream(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+@pytest.mark.asyncio
+async def test_extractor_stream_yields_entities_incrementally():
+    settings = Settings(anthropic_api_key="test-key")
+    with patch("anthropic.AsyncAnthropic"):
+        extractor = EntityExtractor(settings)
+
+    original = "aspirin for diabetes"
+    chunks = [
+        '```json\n[{"text": "aspi',
+        'rin", "start_pos": 0, "end_pos": 7, "domain": "chemical", "confidence": 0.9},',
+        ' {"text": "diabetes", "domain": "disease", "confidence": 0.8},',
+        ' {"text": "x", "domain": "invalid_domain"}]\n```',
+    ]
+    extractor._client.messages.stream = lambda **kwargs: _FakeTextStream(chunks)
+
+    entities = [e async for e in extractor.extract_stream(original)]
+    assert [(e["text"], e["start_pos"]) for e in entities] == [("aspirin", 0), ("diabetes", 12)]
+
+
+@pytest.mark.asyncio
+async def test_extractor_stream_skips_prose_braces_and_falls_back(caplog):
+    settings = Settings(anthropic_api_key="test-key")
+    with patch("anthropic.AsyncAnthropic"):
+        extractor = EntityExtractor(settings)
+
+    original = "asthma and flu"
+    chunks = ['Sure {see below}: [{"text": "asthma", "domain": "disease"}, ', '{"text": "flu"']
+    extractor._client.messages.stream = lambda **kwargs: _FakeTextStream(chunks)
+    entities = [e async for e in extractor.extract_stream(original)]
+    assert [e["text"] for e in entities] == ["asthma"]
+
+    # Nothing parseable streamed: the full text goes through _parse_response
+    extractor._client.messages.stream = lambda **kwargs: _FakeTextStream(["I can't help"])
+    with caplog.at_level("WARNING"):
+        assert [e async for e in extractor.extract_stream(original)] == []
+    assert "Failed to parse LLM entity extraction response" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_extractor_stream_survives_chunk_split_at_any_offset():
+    settings = Settings(anthropic_api_key="test-key")
+    with patch("anthropic.AsyncAnthropic"):
+        extractor = EntityExtractor(settings)
+
+    original = "asthma and flu"
+    raw = (
+        'Sure {see below}: [{"text": "asthma", "domain": "disease", "confidence": 0.9,'
+        ' "negated": false}, {"text": "flu", "domain": "disease", "confidence": 0.75}]'
+    )
+    for i in range(len(raw) + 1):
+        chunks = [raw[:i], raw[i:]]
+        extractor._client.messages.stream = lambda **kwargs: _FakeTextStream(chunks)
+        entities = [e async for e in extractor.extract_stream(original)]
+        assert [e["text"] for e in entities] == ["asthma", "flu"], i
+
+
 # ---------------------------------------------------------------------------
 # Unit tests: OLSClient — fieldList and synonym matching
 # ---------------------------------------------------------------------------
@@ -307,6 +658,89 @@ async def test_ols_find_by_synonym_misses_when_synonym_field_null(httpx_mock):
     assert results == [], "synonym=null must not produce a match"
 
 
+@pytest.mark.asyncio
+async def test_annotate_does_not_cache_ols_failures(httpx_mock, settings):
+    # Stages 1-3 all fail the first time, then OLS recovers
+    for _ in range(3):
+        httpx_mock.add_response(status_code=503)
+    httpx_mock.add_response(json=OLS_SEARCH_RESPONSE_WITH_SYNONYMS, is_reusable=True)
+
+    async with OntologyAnnotator(settings) as annotator:
+        first = await annotator.annotate("aspirin", domain="chemical")
+        second = await annotator.annotate("aspirin", domain="chemical")
+        await annotator.annotate("aspirin", domain="chemical")
+
+    assert first["matches"] == []
+    assert second["matches"][0]["term_id"] == "CHEBI:15365"
+    # 3 failed + exact and synonym on the retry; the third call is a cache hit
+    assert len(httpx_mock.get_requests()) == 5
+
+
+@pytest.mark.asyncio
+async def test_ols_find_exact_bulk_demultiplexes_by_label(httpx_mock):
+    httpx_mock.add_response(json=OLS_SEARCH_RESPONSE_WITH_SYNONYMS)
+
+    settings = Settings(ols_api_url="https://www.ebi.ac.uk/ols4/api")
+    async with OLSClient(settings) as client:
+        results = await client.find_exact_bulk(
+            ["Acetylsalicylic acid", "not a term"], ontologies=["chebi"]
+        )
+
+    request = httpx_mock.get_request()
+    assert request.url.params["q"] == '"acetylsalicylic acid" OR "not a term"'
+    assert request.url.params["exact"] == "true"
+    assert list(results) == ["acetylsalicylic acid"]
+    assert results["acetylsalicylic acid"][0]["term_id"] == "CHEBI:15365"
+
+
+@pytest.mark.asyncio
+async def test_ols_find_exact_bulk_splits_large_batches(httpx_mock):
+    httpx_mock.add_response(json=OLS_SEARCH_RESPONSE_WITH_SYNONYMS)
+    httpx_mock.add_response(status_code=503)
+
+    settings = Settings(ols_api_url="https://www.ebi.ac.uk/ols4/api")
+    queries = ["acetylsalicylic acid", *(f"term {i}" for i in range(24))]
+    async with OLSClient(settings) as client:
+        results = await client.find_exact_bulk(queries)
+
+    requests = httpx_mock.get_requests()
+    assert [r.url.params["q"].count(" OR ") + 1 for r in requests] == [20, 5]
+    assert requests[0].url.params["rows"] == "200"
+    # A failed sub-query only loses its own hits
+    assert list(results) == ["acetylsalicylic acid"]
+
+
+@pytest.mark.asyncio
+async def test_ols_response_cache_persists_across_clients(httpx_mock, tmp_path):
+    httpx_mock.add_response(json=OLS_SEARCH_RESPONSE_WITH_SYNONYMS)
+
+    settings = Settings(
+        ols_api_url="https://www.ebi.ac.uk/ols4/api",
+        response_cache_path=str(tmp_path / "responses.sqlite"),
+    )
+    async with OLSClient(settings) as client:
+        first = await client.find_by_synonym("aspirin", ontologies=["chebi"])
+    # A fresh client (e.g. after a restart) is answered from disk without HTTP
+    async with OLSClient(settings) as client:
+        second = await client.find_by_synonym("aspirin", ontologies=["chebi"])
+
+    assert len(httpx_mock.get_requests()) == 1
+    assert second == first
+
+
+@pytest.mark.asyncio
+async def test_ols_clients_share_connection_pool():
+    settings = Settings(ols_api_url="https://www.ebi.ac.uk/ols4/api")
+    first = OLSClient(settings)
+    second = OLSClient(settings)
+    assert first._client is second._client
+
+    await first.close()
+    assert not second._client.is_closed
+    await second.close()
+    assert second._client.is_closed
+
+
 def test_extractor_fixes_wrong_positions():
     settings = Settings(anthropic_api_key="test-key")
     with patch("anthropic.AsyncAnthropic"):
@@ -322,3 +756,318 @@ def test_extractor_fixes_wrong_positions():
     assert len(result) == 1
     assert result[0]["start_pos"] == original.index("diabetes")
     assert result[0]["end_pos"] == original.index("diabetes") + len("diabetes")
+
+
+# ---------------------------------------------------------------------------
+# Unit tests: LocalExactIndex
+# ---------------------------------------------------------------------------
+
+SAMPLE_OBO = """\
+format-version: 1.2
+ontology: mondo
+
+[Term]
+id: MONDO:0005015
+name: diabetes mellitus
+def: "A metabolic disorder characterized by hyperglycaemia." []
+synonym: "DM" EXACT []
+synonym: "sugar disease" RELATED []
+xref: DOID:9351 {source="MONDO:equivalentTo"}
+
+[Term]
+id: MONDO:0000001
+name: disease
+is_obsolete: true
+"""
+
+
+def test_local_index_parses_obo(tmp_path):
+    obo = tmp_path / "mondo.obo"
+    obo.write_text(SAMPLE_OBO)
+    index = LocalExactIndex.from_obo_files([obo])
+
+    exact = index.find_exact("Diabetes Mellitus", ["mondo"])
+    assert [t["term_id"] for t in exact] == ["MONDO:0005015"]
+    assert exact[0]["cross_references"] == {"doid": "DOID:9351"}
+    assert index.find_by_synonym("dm")[0]["label"] == "diabetes mellitus"
+    assert index.find_by_synonym("sugar disease") == []  # RELATED synonyms not indexed
+    assert index.find_exact("disease") == []  # obsolete terms skipped
+    assert index.find_exact("diabetes mellitus", ["doid"]) == []
+    # Parsed index is pickled beside the source file for the next start-up
+    assert (tmp_path / "mondo.obo.index.pkl").exists()
+
+
+def test_local_index_skips_unreadable_obo(tmp_path, caplog):
+    latin1 = tmp_path / "legacy.obo"
+    latin1.write_bytes("[Term]\nid: X:1\nname: Sjögren syndrome\n".encode("latin-1"))
+    obo = tmp_path / "mondo.obo"
+    obo.write_text(SAMPLE_OBO)
+
+    with caplog.at_level("WARNING"):
+        index = LocalExactIndex.from_obo_files([latin1, tmp_path / "missing.obo", obo])
+
+    assert [t["term_id"] for t in index.find_exact("diabetes mellitus")] == ["MONDO:0005015"]
+    assert caplog.text.count("Skipping local ontology file") == 2
+
+
+@pytest.mark.asyncio
+async def test_annotate_local_index_skips_ols(tmp_path):
+    obo = tmp_path / "mondo.obo"
+    obo.write_text(SAMPLE_OBO)
+    settings = Settings(anthropic_api_key="test-key", local_obo_files=str(obo))
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            result = await annotator.annotate("DM", domain="disease")
+
+    assert result["matches"][0]["term_id"] == "MONDO:0005015"
+    assert result["matches"][0]["match_type"] == "synonym"
+    mock_ols.find_exact.assert_not_awaited()
+
+
+def test_extractor_fixes_wrong_positions_for_many_entities():
+    settings = Settings(anthropic_api_key="test-key")
+    with patch("anthropic.AsyncAnthropic"):
+        extractor = EntityExtractor(settings)
+
+    original = "Hypertension and diabetes; later, more Diabetes"
+    raw = (
+        '[{"text": "diabetes", "domain": "disease", "confidence": 0.9},'
+        ' {"text": "hypertension", "start_pos": 5, "end_pos": 9,'
+        ' "domain": "disease", "confidence": 0.8},'
+        ' {"text": "asthma", "domain": "disease", "confidence": 0.7}]'
+    )
+    result = extractor._parse_response(raw, original)
+    assert [(e["text"], e["start_pos"], e["end_pos"]) for e in result] == [
+        ("diabetes", 17, 25),
+        ("hypertension", 0, 12),
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Unit tests: MCP server handlers
+# ---------------------------------------------------------------------------
+
+
+def test_tool_argument_validators_apply_defaults_and_reject_bad_input():
+    import fastjsonschema
+
+    from ontology_annotator import server
+
+    validate = server._VALIDATORS["annotate_ontology_terms"]
+    assert validate({"texts": "aspirin"})["min_confidence"] == 0.7
+    for bad in ({"texts": 5}, {"texts": ["x"], "domain": "nope"}, {}):
+        with pytest.raises(fastjsonschema.JsonSchemaValueException):
+            validate(bad)
+    with pytest.raises(fastjsonschema.JsonSchemaValueException):
+        server._VALIDATORS["batch_annotate"]({"requests": [{"texts": [1]}]})
+
+
+@pytest.mark.asyncio
+async def test_handle_extract_annotates_streamed_entities(settings):
+    from ontology_annotator import server
+
+    entities = [
+        {
+            "text": "aspirin",
+            "start_pos": 0,
+            "end_pos": 7,
+            "domain": "chemical",
+            "extraction_confidence": 0.9,
+        },
+        {
+            "text": "diabetes",
+            "start_pos": 12,
+            "end_pos": 20,
+            "domain": "disease",
+            "extraction_confidence": 0.8,
+        },
+    ]
+
+    async def fake_stream(text, domains=None):
+        for entity in entities:
+            yield entity
+
+    annotator = AsyncMock()
+    annotator.annotate = AsyncMock(
+        side_effect=lambda text, **kwargs: {"input_text": text, "matches": [{"label": text}]}
+    )
+    extractor = AsyncMock()
+    extractor.extract_stream = fake_stream
+    response = await server._handle_extract(
+        {"text": "aspirin for diabetes"}, settings, annotator, extractor
+    )
+
+    payload = json.loads(response[0].text)
+    assert [e["text"] for e in payload["extracted_entities"]] == ["aspirin", "diabetes"]
+    assert payload["extracted_entities"][1]["matches"] == [{"label": "diabetes"}]
+    assert annotator.annotate.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_handle_extract_chunks_large_responses(settings):
+    from ontology_annotator import server
+
+    async def fake_stream(text, domains=None):
+        for i in range(40):
+            yield {
+                "text": f"term{i}",
+                "start_pos": 0,
+                "end_pos": 5,
+                "domain": "disease",
+                "extraction_confidence": 0.9,
+            }
+
+    annotator = AsyncMock()
+    annotator.annotate = AsyncMock(return_value={"matches": []})
+    extractor = AsyncMock()
+    extractor.extract_stream = fake_stream
+    response = await server._handle_extract({"text": "many terms"}, settings, annotator, extractor)
+
+    chunks = [json.loads(c.text) for c in response]
+    assert "\n" not in response[0].text
+    assert [len(c["extracted_entities"]) for c in chunks] == [16, 16, 8]
+    assert {c["total_chunks"] for c in chunks} == {3}
+    assert chunks[2]["extracted_entities"][-1]["text"] == "term39"
+    assert [c.get("original_text") for c in chunks] == ["many terms", None, None]
+
+
+@pytest.mark.asyncio
+async def test_handle_annotate_uses_passed_settings_for_pretty_json():
+    from ontology_annotator import server
+
+    annotator = AsyncMock()
+    annotator.annotate_batch = AsyncMock(return_value=[{"input_text": "x", "matches": []}])
+    response = await server._handle_annotate(
+        {"texts": "x"}, Settings(pretty_json=True), annotator
+    )
+    assert response[0].text.startswith('{\n  "annotations"')
+
+
+@pytest.mark.asyncio
+async def test_handle_extract_cancels_sibling_lookups_on_failure(settings):
+    from ontology_annotator import server
+    from ontology_annotator.ols_client import OLSError
+
+    async def fake_stream(text, domains=None):
+        for name in ("slow", "broken"):
+            yield {
+                "text": name,
+                "start_pos": 0,
+                "end_pos": len(name),
+                "domain": "disease",
+                "extraction_confidence": 0.9,
+            }
+
+    cancelled = asyncio.Event()
+
+    async def annotate(text, **kwargs):
+        if text == "broken":
+            raise OLSError("OLS HTTP 503")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    annotator = AsyncMock()
+    annotator.annotate = annotate
+    extractor = AsyncMock()
+    extractor.extract_stream = fake_stream
+    response = await server._handle_extract({"text": "slow broken"}, settings, annotator, extractor)
+
+    assert json.loads(response[0].text) == {"error": "Annotation failed: OLS HTTP 503"}
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_handle_extract_cancels_real_annotator_lookups_on_failure(settings):
+    from ontology_annotator import server
+    from ontology_annotator.ols_client import OLSError
+
+    async def fake_stream(text, domains=None):
+        for name in ("slow term", "broken term"):
+            yield {
+                "text": name,
+                "start_pos": 0,
+                "end_pos": len(name),
+                "domain": "disease",
+                "extraction_confidence": 0.9,
+            }
+
+    cancelled = asyncio.Event()
+    finished = asyncio.Event()
+
+    async def find_exact(text, ontologies=None):
+        if text == "broken term":
+            raise OLSError("OLS HTTP 503")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        finished.set()
+        return []
+
+    extractor = AsyncMock()
+    extractor.extract_stream = fake_stream
+    with patch("ontology_annotator.annotator.OLSClient") as MockOLS:
+        mock_ols = AsyncMock()
+        mock_ols.find_exact = find_exact
+        mock_ols.close = AsyncMock()
+        MockOLS.return_value = mock_ols
+
+        async with OntologyAnnotator(settings) as annotator:
+            response = await server._handle_extract(
+                {"text": "slow term, broken term"}, settings, annotator, extractor
+            )
+            await asyncio.sleep(0)
+
+            assert json.loads(response[0].text) == {"error": "Annotation failed: OLS HTTP 503"}
+            assert cancelled.is_set() and not finished.is_set()
+            assert not annotator._inflight
+
+
+@pytest.mark.asyncio
+async def test_handle_batch_annotate_reports_errors_per_request(settings):
+    from ontology_annotator import server
+
+    annotator = AsyncMock()
+    annotator.annotate_batch = AsyncMock(
+        side_effect=lambda texts, **kwargs: [{"input_text": t, "matches": []} for t in texts]
+    )
+    response = await server._handle_batch_annotate(
+        {
+            "requests": [
+                {"texts": "aspirin", "domain": "chemical"},
+                {"texts": ["x"], "domain": "not_a_domain"},
+                {"texts": ["diabetes", "asthma"]},
+                {"texts": []},
+            ]
+        },
+        settings,
+        annotator,
+    )
+
+    results = json.loads(response[0].text)["results"]
+    assert [r["input_text"] for r in results[0]["annotations"]] == ["aspirin"]
+    assert results[1]["error"].startswith("Invalid domain 'not_a_domain'")
+    assert len(results[2]["annotations"]) == 2
+    assert results[3] == {"annotations": []}
+    assert annotator.annotate_batch.await_count == 2
+
+
+def test_extractor_repairs_positions_near_model_hint():
+    settings = Settings(anthropic_api_key="test-key")
+    with patch("anthropic.AsyncAnthropic"):
+        extractor = EntityExtractor(settings)
+
+    original = "diabetes first, then type 2 diabetes"
+    # Off-by-one start_pos: the repair should prefer the occurrence after the hint,
+    # and a truncated (unclosed) fence should still parse
+    raw = '```json\n[{"text": "diabetes", "start_pos": 27, "end_pos": 35, "domain": "disease"}]'
+    result = extractor._parse_response(raw, original)
+    assert [(e["start_pos"], e["end_pos"]) for e in result] == [(28, 36)]